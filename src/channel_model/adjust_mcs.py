@@ -5,7 +5,7 @@ from src.resource_allocation.algo.new_resource import NewResource
 from src.resource_allocation.ds.eutran import EUserEquipment
 from src.resource_allocation.ds.ngran import DUserEquipment, GUserEquipment
 from src.resource_allocation.ds.nodeb import ENBInfo, GNBInfo
-from src.resource_allocation.ds.rb import ResourceBlock
+from src.resource_allocation.ds.rb import RBList, ResourceBlock
 from src.resource_allocation.ds.ue import UserEquipment
 from src.resource_allocation.ds.undo import Undo
 from src.resource_allocation.ds.util_enum import E_MCS, G_MCS, NodeBType, UEType
@@ -45,9 +45,8 @@ class AdjustMCS(Undo):
         for nb_info in ['gnb_info', 'enb_info']:
             if hasattr(ue, nb_info):
                 ue_nb_info: Union[GNBInfo, ENBInfo] = getattr(ue, nb_info)
-                ue_nb_info.rb.sort(key=lambda x: x.j_start)  # sort by time
-                ue_nb_info.rb.sort(key=lambda x: x.i_start)  # sort by freq
-                ue_nb_info.rb.sort(key=lambda x: x.mcs.value, reverse=True)  # sort by mcs
+                # sort by mcs, then by freq and time
+                ue_nb_info.rb.sort(key=lambda x: (-x.mcs.value, x.i_start, x.j_start))
 
         while True:  # ue_throughput >= QoS
             # sum throughput
@@ -73,25 +72,23 @@ class AdjustMCS(Undo):
                     worst_enb_rb_eff: float = float("inf")
                 worst_rb: ResourceBlock = worst_gnb_rb if worst_gnb_rb_eff < worst_enb_rb_eff else worst_enb_rb
                 if isinstance(worst_rb.mcs, G_MCS):
-                    tmp_ue_throughput: float = self.throughput_ue(ue.gnb_info.rb[:-1]) + self.throughput_ue(
-                        ue.enb_info.rb)
+                    tmp_ue_throughput: float = ue.gnb_info.rb.throughput_without_last() + ue.enb_info.rb.throughput()
                 elif isinstance(worst_rb.mcs, E_MCS):
-                    tmp_ue_throughput: float = self.throughput_ue(ue.enb_info.rb[:-1]) + self.throughput_ue(
-                        ue.gnb_info.rb)
+                    tmp_ue_throughput: float = ue.enb_info.rb.throughput_without_last() + ue.gnb_info.rb.throughput()
                 else:
                     raise AttributeError
             elif ue.ue_type == UEType.G:
                 worst_rb: ResourceBlock = ue.gnb_info.rb[-1]
-                tmp_ue_throughput: float = self.throughput_ue(ue.gnb_info.rb[:-1])
+                tmp_ue_throughput: float = ue.gnb_info.rb.throughput_without_last()
             elif ue.ue_type == UEType.E:
                 worst_rb: ResourceBlock = ue.enb_info.rb[-1]
-                tmp_ue_throughput: float = self.throughput_ue(ue.enb_info.rb[:-1])
+                tmp_ue_throughput: float = ue.enb_info.rb.throughput_without_last()
             else:
                 raise AssertionError
 
             if tmp_ue_throughput > ue.request_data_rate:
                 # Officially remove the RB
-                self.append_undo(lambda b=worst_rb: b.undo(), lambda b=worst_rb: b.purge_undo())
+                self.append_undo_nested(worst_rb)
                 worst_rb.remove_rb()
                 continue
             elif ue_throughput >= ue.request_data_rate:
@@ -100,17 +97,17 @@ class AdjustMCS(Undo):
                 for nb_info in ['gnb_info', 'enb_info']:
                     if hasattr(ue, nb_info):
                         ue_nb_info: Union[GNBInfo, ENBInfo] = getattr(ue, nb_info)
-                        self.append_undo(lambda n_i=ue_nb_info, origin=ue_nb_info.mcs: setattr(n_i, 'mcs', origin))
+                        self.append_undo_attr(ue_nb_info, 'mcs', ue_nb_info.mcs)
                         if ue_nb_info.rb:
                             ue_nb_info.update_mcs()
                         else:
                             ue_nb_info.mcs = None
 
                 # update throughput
-                self.append_undo(lambda origin=ue.throughput: setattr(ue, 'throughput', origin))
+                self.append_undo_attr(ue, 'throughput', ue.throughput)
                 ue.update_throughput()
 
-                self.append_undo(lambda origin=ue.is_to_recalculate_mcs: setattr(ue, 'is_to_recalculate_mcs', origin))
+                self.append_undo_attr(ue, 'is_to_recalculate_mcs', ue.is_to_recalculate_mcs)
                 ue.is_to_recalculate_mcs = False
                 return True
             elif not allow_lower_mcs:
@@ -131,7 +128,7 @@ class AdjustMCS(Undo):
                 new_resource = NewResource()
                 rb: Union[ResourceBlock, bool] = new_resource.add_one_continuous_rb(ue, channel_model)
                 if rb:
-                    self.append_undo(lambda nr=new_resource: nr.undo(), lambda nr=new_resource: nr.purge_undo())
+                    self.append_undo_nested(new_resource)
                 else:
                     return False
                 (ue.gnb_info if rb.layer.nodeb.nb_type == NodeBType.G else ue.enb_info).rb.sort(
@@ -139,9 +136,10 @@ class AdjustMCS(Undo):
 
     @staticmethod
     def throughput_ue(rb_list: List[ResourceBlock]) -> float:
-        if rb_list:
-            lowest_mcs: Union[E_MCS, G_MCS] = min(rb_list, key=lambda rb: rb.mcs.value).mcs
-            return lowest_mcs.value * len(rb_list)
+        if isinstance(rb_list, RBList):
+            return rb_list.throughput()
+        elif rb_list:
+            return min(rb_list, key=lambda rb: rb.mcs.value).mcs.value * len(rb_list)
         else:
             return 0.0
 
@@ -164,9 +162,7 @@ class AdjustMCS(Undo):
         :param channel_model: For adding new RBs if the MCS is lower than the old one.
         """
         # Use the RB with highest overlap times
-        rb_position.sort(key=lambda x: x.j_start, reverse=True)  # sort by time
-        rb_position.sort(key=lambda x: x.i_start, reverse=True)  # sort by freq
-        rb_position.sort(key=lambda x: x.time, reverse=True)
+        rb_position.sort(key=lambda x: (x.time, x.i_start, x.j_start), reverse=True)  # then by freq and time
 
         # collect the overlapped RBs in ue
         lapped_rb: List[ResourceBlock] = []
@@ -180,8 +176,7 @@ class AdjustMCS(Undo):
             if rb not in lapped_rb:
                 non_lapped_rb.append(rb)
 
-        non_lapped_rb.sort(key=lambda x: x.j_start)  # sort by time
-        non_lapped_rb.sort(key=lambda x: x.i_start)  # sort by freq
+        non_lapped_rb.sort(key=lambda x: (x.i_start, x.j_start))  # sort by freq and time
         self.pick_in_order(ue, lapped_rb + non_lapped_rb, channel_model)
 
     @staticmethod
@@ -277,24 +272,23 @@ class AdjustMCS(Undo):
                 nb_rm: ENBInfo = ue.enb_info
                 nb_keep: Optional[GNBInfo] = ue.gnb_info if ue.ue_type == UEType.D and ue.cross_nb else None
 
-            tmp_ue_throughput: float = self.throughput_ue(nb_rm.rb[:-1])  # temporarily remove one RB
+            tmp_ue_throughput: float = nb_rm.rb.throughput_without_last()  # temporarily remove one RB
             if nb_keep:
                 tmp_ue_throughput += self.throughput_ue(nb_keep.rb)
 
             if tmp_ue_throughput >= ue.request_data_rate:
                 rb_to_rm: ResourceBlock = nb_rm.rb[-1]
-                self.append_undo(lambda b=rb_to_rm: b.undo(), lambda b=rb_to_rm: b.purge_undo())
+                self.append_undo_nested(rb_to_rm)
                 rb_to_rm.remove_rb()
             elif ue.calc_throughput() >= ue.request_data_rate:
-                self.append_undo(lambda origin=ue.throughput: setattr(ue, 'throughput', origin))
-                self.append_undo(
-                    lambda origin=ue.is_to_recalculate_mcs: setattr(ue, 'is_to_recalculate_mcs', origin))
+                self.append_undo_attr(ue, 'throughput', ue.throughput)
+                self.append_undo_attr(ue, 'is_to_recalculate_mcs', ue.is_to_recalculate_mcs)
 
                 if hasattr(ue, 'gnb_info'):
-                    self.append_undo(lambda n_i=ue.gnb_info, origin=ue.gnb_info.mcs: setattr(n_i, 'mcs', origin))
+                    self.append_undo_attr(ue.gnb_info, 'mcs', ue.gnb_info.mcs)
                     ue.gnb_info.update_mcs()
                 if hasattr(ue, 'enb_info'):
-                    self.append_undo(lambda n_i=ue.enb_info, origin=ue.enb_info.mcs: setattr(n_i, 'mcs', origin))
+                    self.append_undo_attr(ue.enb_info, 'mcs', ue.enb_info.mcs)
                     ue.enb_info.update_mcs()
                 ue.update_throughput()
                 ue.is_to_recalculate_mcs = False
@@ -314,6 +308,6 @@ class AdjustMCS(Undo):
                     ue, channel_model,
                     same_numerology=new_same_numerology_rb, func_is_available_rb=func_is_available_rb)
                 if rb:
-                    self.append_undo(lambda nr=new_resource: nr.undo(), lambda nr=new_resource: nr.purge_undo())
+                    self.append_undo_nested(new_resource)
                 else:
                     return False
@@ -0,0 +1,53 @@
+import math
+from typing import Callable, Dict, Type
+
+
+class PathLoss:
+    """
+    A path loss model.
+    The distance is in kilometer, and the path loss is in dB.
+    """
+
+    @staticmethod
+    def path_loss(distance: float) -> float:
+        raise NotImplementedError
+
+
+PATH_LOSS: Dict[str, Type[PathLoss]] = {}
+
+
+def register_path_loss(name: str) -> Callable[[Type[PathLoss]], Type[PathLoss]]:
+    """Register a path loss model, which can be selected by its' name in the data set."""
+
+    def register(model: Type[PathLoss]) -> Type[PathLoss]:
+        assert name not in PATH_LOSS, f'Path loss model {name} is already registered.'
+        PATH_LOSS[name] = model
+        return model
+
+    return register
+
+
+@register_path_loss('UMa')
+class UMa(PathLoss):
+    """
+    A UMa (urban macro-cell) outdoor path loss model.
+    ref: TR 36.931 v13.0.0
+    """
+
+    @staticmethod
+    def path_loss(distance: float) -> float:
+        return 128.1 + 37.6 * math.log10(distance)  # dB
+
+
+@register_path_loss('UMi')
+class UMi(PathLoss):
+    """
+    A UMi (urban micro-cell) outdoor path loss model.
+    ref: Proportional Fairness through Dual Connectivity in Heterogeneous Networks
+         Dual-Connectivity Enabled Resource Allocation Approach With eICIC
+         for Throughput Maximization in HetNets With Backhaul Constraint.
+    """
+
+    @staticmethod
+    def path_loss(distance: float) -> float:
+        return 140.7 + 36.7 * math.log10(distance)  # dB
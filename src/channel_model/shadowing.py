@@ -0,0 +1,70 @@
+import math
+import random
+from typing import List, Optional
+
+import numpy as np
+
+
+class Shadowing:
+    """
+    The shadowing(dB) of the links, generated once when the channel model is constructed.
+    seed is None: the legacy mode, every link has the same value as the original noise(8).
+    seed is set: every (NodeB, UE) link has its' own log-normal shadowing, drawn in bulk from the seed.
+    """
+
+    def __init__(self, noise_variance: int = 8, seed: Optional[int] = None):
+        self.noise_variance: int = noise_variance
+        self.seed: Optional[int] = seed
+        self.is_per_link: bool = seed is not None
+        self._rng: Optional[np.random.Generator] = np.random.default_rng(seed) if self.is_per_link else None
+        self._table: np.ndarray = np.empty((0, 0))  # (NodeB x UE), in dB
+
+        # the shadowing of a link not in the table, e.g. the far away BSs using the same channel
+        self.default: float = 0.0 if self.is_per_link else self.legacy_noise(noise_variance)
+
+    def table(self, num_nb: int, num_ue: int) -> np.ndarray:
+        """
+        The shadowing of the (NodeB x UE) links.
+        The table only grows, the values of the links already drawn are kept.
+        """
+        if not self.is_per_link:
+            return np.full((num_nb, num_ue), self.default)
+        old_nb, old_ue = self._table.shape
+        if num_nb > old_nb or num_ue > old_ue:
+            table: np.ndarray = np.zeros((max(num_nb, old_nb), max(num_ue, old_ue)))
+            table[:old_nb, :old_ue] = self._table
+            is_new: np.ndarray = np.ones(table.shape, dtype=bool)
+            is_new[:old_nb, :old_ue] = False
+            table[is_new] = self._rng.normal(0.0, math.sqrt(self.noise_variance), int(is_new.sum()))
+            self._table: np.ndarray = table
+        return self._table[:num_nb, :num_ue]
+
+    @classmethod
+    def legacy_noise(cls, noise_variance: int) -> float:
+        """
+        The original shadowing, which is the same for every call.
+        A private random generator is seeded instead of the global one.
+        """
+        seed: int = 0 - random.Random('foobar').randint(1, 100)
+        slevel: float = 0.0
+        runiform: List[float] = [0.0, 0.0]
+        while slevel < 1.0:
+            runiform[0]: float = cls.bsd_rand(seed)
+            runiform[1]: float = cls.bsd_rand(seed)
+            runiform[0]: float = 2.0 * runiform[0] - 1.0
+            runiform[1]: float = 2.0 * runiform[1] - 1.0
+            slevel: float = runiform[0] * runiform[0] + runiform[1] * runiform[1]
+
+        log_value: float = math.log10(slevel)
+        stemp: float = 2 * log_value / slevel  # used "-2" in Wang's C code
+        noise: float = math.sqrt(noise_variance) * runiform[0] * math.sqrt(stemp)
+        return noise  # dB
+
+    @staticmethod
+    def bsd_rand(seed: int) -> float:
+        """
+        LCG(Linear congruential generator)
+        https://rosettacode.org/wiki/Linear_congruential_generator#Python
+        """
+        seed: float = (1103515245 * seed + 12345) & 0x7fffffff
+        return seed
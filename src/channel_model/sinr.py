@@ -1,21 +1,47 @@
+from __future__ import annotations
+
 import math
 import random
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type, TYPE_CHECKING
+
+import numpy as np
 
+from src.channel_model.path_loss import PATH_LOSS, PathLoss
+from src.channel_model.shadowing import Shadowing
+from src.channel_model.sinr_engine import SINREngine
 from src.resource_allocation.ds.frame import BaseUnit
-from src.resource_allocation.ds.nodeb import NodeB
 from src.resource_allocation.ds.rb import ResourceBlock
 from src.resource_allocation.ds.ue import UserEquipment
 from src.resource_allocation.ds.undo import Undo
 from src.resource_allocation.ds.util_enum import NodeBType
 from src.resource_allocation.ds.util_type import Coordinate
 
+if TYPE_CHECKING:
+    from src.resource_allocation.ds.nodeb import NodeB
+
 
 class ChannelModel(Undo):
-    def __init__(self, cochannel_index: Dict):
+    def __init__(self, cochannel_index: Dict, shadowing_seed: Optional[int] = None,
+                 path_loss: Optional[Dict[NodeBType, str]] = None):
+        """
+        :param path_loss: The name of the path loss model of each type of BS, in PATH_LOSS. Default UMa.
+        """
         super().__init__()
         self.cochannel_index: Dict = cochannel_index
+        path_loss: Dict[NodeBType, str] = {NodeBType.E: 'UMa', NodeBType.G: 'UMa', **(path_loss or {})}
+        self.path_loss: Dict[NodeBType, Type[PathLoss]] = {nb_type: PATH_LOSS[name]
+                                                            for nb_type, name in path_loss.items()}
+        self.shadowing: Shadowing = Shadowing(noise_variance=8, seed=shadowing_seed)
         self.channel_bs: Tuple[List[Coordinate], ...] = self.gen_channel_interference()
+        self._nb_index: Dict[NodeB, int] = {}
+        self._ue_index: Dict[UserEquipment, int] = {}
+        self._power_rx_table: np.ndarray = np.empty((0, 0))  # (NodeB x UE), in mW
+        self._nb_is_gnb: np.ndarray = np.zeros(0, dtype=bool)  # NodeB: if it's a gNB
+        self._bs_list, self._channel_bs_index = self._index_channel_bs()
+        self._channel_ue_index: Dict[UserEquipment, int] = {}
+        self._channel_interference_table: np.ndarray = np.empty((len(self.channel_bs), 0))  # (channel x UE), in mW
+        self.engine: SINREngine = SINREngine(self)
+        self._mcs_ceiling: Dict[Tuple[int, int], Union[E_MCS, G_MCS]] = {}  # the (NodeB, UE) link: MCS
 
     @Undo.undo_func_decorator
     def sinr_ue(self, ue: UserEquipment):
@@ -23,110 +49,85 @@ class ChannelModel(Undo):
         Update the SINR for every RBs in the UE,
         but this isn't the final SINR of the UE.
         """
+        rb_list: List[ResourceBlock] = []
         if hasattr(ue, 'gnb_info'):
-            for rb in ue.gnb_info.rb:
-                self._sinr_rb(rb)
+            rb_list.extend(ue.gnb_info.rb)
         if hasattr(ue, 'enb_info'):
-            for rb in ue.enb_info.rb:
-                self._sinr_rb(rb)
+            rb_list.extend(ue.enb_info.rb)
+        self._sinr_rb(*rb_list)
+
+    @Undo.undo_func_decorator
+    def sinr_ue_batch(self, ue_list: Iterable[UserEquipment]):
+        """
+        Update the SINR of the UEs in one pass, the same as calling sinr_ue() for each UE.
+        The BUs to recalculate are deduplicated and calculated together,
+        and only the RBs having these BUs are updated. The SINR of the other RBs is already up to date.
+        One undo frame for the whole batch.
+        """
+        rb_list: Dict[ResourceBlock, None] = {}  # keep the order of the RBs
+        for ue in ue_list:
+            if hasattr(ue, 'gnb_info'):
+                rb_list.update(dict.fromkeys(ue.gnb_info.rb))
+            if hasattr(ue, 'enb_info'):
+                rb_list.update(dict.fromkeys(ue.enb_info.rb))
+        self._sinr_rb(*rb_list, is_to_skip_updated=True)
 
     @Undo.undo_func_decorator
     def sinr_rb(self, rb: ResourceBlock):
         self._sinr_rb(rb)
 
-    def _sinr_rb(self, rb: ResourceBlock):
+    def _sinr_rb(self, *rb_list: ResourceBlock, is_to_skip_updated: bool = False):
+        """
+        Calculate the BUs of all the RBs in one pass, then update the SINR of each RB by its' worst BU.
+        :param is_to_skip_updated: Don't update the RBs without any BU to recalculate.
+        """
         self.assert_undo_function()
-        tmp_sinr_rb: float = float('inf')
-        for bu_i in range(rb.position[0], rb.position[1] + 1):
-            for bu_j in range(rb.position[2], rb.position[3] + 1):
-                self._sinr_bu(rb.layer.bu[bu_i][bu_j])
-                if tmp_sinr_rb > rb.layer.bu[bu_i][bu_j].sinr:
-                    tmp_sinr_rb: float = rb.layer.bu[bu_i][bu_j].sinr
-        self.append_undo(lambda origin=rb.sinr: setattr(rb, 'sinr', origin))
-        rb.sinr = tmp_sinr_rb
-        # print(f'RB SINR: {rb.sinr}')
-
-    def _sinr_bu(self, bu: BaseUnit):
-        """
-        SINR(ratio) = rx power(mW) / (noma(mW) + ini(mW) + cross-tier(mW) + interference from other BSs(mW) + awgn(mW))
-        :param bu: The BU to calculate its' SINR.
-        :return: SINR in dB
+        bu_list: List[BaseUnit] = []
+        rb_to_update: List[ResourceBlock] = []
+        for rb in rb_list:
+            bu_to_recalculate: List[BaseUnit] = [bu for row in rb.layer.bu[rb.i_start:rb.i_end + 1]
+                                                 for bu in row[rb.j_start:rb.j_end + 1] if bu.is_to_recalculate_sinr]
+            if bu_to_recalculate or not is_to_skip_updated:
+                rb_to_update.append(rb)
+            bu_list.extend(bu_to_recalculate)
+        self._sinr_bu(bu_list)
+        if not rb_to_update:
+            return True
+
+        self.append_undo(lambda r_l=rb_to_update, origin=[rb.sinr for rb in rb_to_update]: [
+            setattr(rb, 'sinr', sinr) for rb, sinr in zip(r_l, origin)])
+        sinr_rb: Dict[NodeBType, List[Tuple[ResourceBlock, float]]] = {}
+        for rb in rb_to_update:
+            tmp_sinr_rb: float = float('inf')
+            for row in rb.layer.bu[rb.i_start:rb.i_end + 1]:
+                for bu in row[rb.j_start:rb.j_end + 1]:
+                    if tmp_sinr_rb > bu.sinr:
+                        tmp_sinr_rb: float = bu.sinr
+            sinr_rb.setdefault(rb.layer.nodeb.nb_type, []).append((rb, tmp_sinr_rb))
+        for nb_type, rb_sinr in sinr_rb.items():  # look up the MCS of the RBs of each type of BS at once
+            for (rb, sinr), mcs in zip(rb_sinr, nb_type.to_mcs.sinr_to_mcs_array([sinr for _, sinr in rb_sinr])):
+                rb.set_sinr(sinr, mcs)
+
+    def _sinr_bu(self, bu_list: List[BaseUnit]):
+        """
+        Update the SINR of the BUs in bu_list, in dB.
+        See SINREngine for the calculation.
         """
         self.assert_undo_function()
-        if not bu.is_to_recalculate_sinr:
+        if not bu_list:
             return True
-        # print(f'rb({bu.relative_i},{bu.relative_j})')
-        rb: ResourceBlock = bu.within_rb
-        ue: UserEquipment = rb.ue
-        nodeb: NodeB = bu.layer.nodeb
-        power_rx: float = self.power_rx(
-            nodeb.nb_type,
-            nodeb.power_tx,
-            ue.coordinate.distance_gnb if nodeb.nb_type == NodeBType.G else ue.coordinate.distance_enb)
-        # print(f'power rx: {10 * math.log10(power_rx)}')
-
-        interference_noma: float = 0.0
-        interference_ini: float = 0.0
-        interference_cross: float = 0.0
-        for overlapped_rb in bu.overlapped_rb:
-            overlapped_bu_power_rx: float = self.power_rx(
-                overlapped_rb.layer.nodeb.nb_type,
-                overlapped_rb.layer.nodeb.power_tx,
-                overlapped_rb.ue.coordinate.distance_gnb if overlapped_rb.layer.nodeb.nb_type == NodeBType.G else (
-                    overlapped_rb.ue.coordinate.distance_enb))
-            interference_from_overlapped_bu: float = self.power_rx(
-                overlapped_rb.layer.nodeb.nb_type,
-                overlapped_rb.layer.nodeb.power_tx,
-                ue.coordinate.distance_gnb if overlapped_rb.layer.nodeb.nb_type == NodeBType.G else (
-                    ue.coordinate.distance_enb))
-
-            # NOMA interference
-            if overlapped_rb.layer.nodeb.nb_type == NodeBType.G and nodeb.nb_type == NodeBType.G:
-                """
-                The formal way is compared by |h|^2 / N.
-                As the reference bellow, this part is done by comparing power and power is related to distance.
-                https://ecewireless.blogspot.com/2020/04/how-to-simulate-ber-capacity-and-outage.html
-                """
-                if power_rx < overlapped_bu_power_rx:   # because every UE has the same tx power
-                # if power_rx > overlapped_bu_power_rx:
-                # if ue.coordinate.distance_gnb > overlapped_rb.ue.coordinate.distance_gnb:
-                    interference_noma += interference_from_overlapped_bu
-                    # print(f'interference_noma: {10 * math.log10(interference_noma)}')
-            # cross-tier interference
-            if overlapped_rb.layer.nodeb.nb_type != nodeb.nb_type:
-                interference_cross += interference_from_overlapped_bu
-                # print(f'interference_cross: {10 * math.log10(interference_cross)}')
-            # inter-numerology interference
-            if overlapped_rb.numerology.freq != rb.numerology.freq:
-                interference_ini += interference_from_overlapped_bu
-                # print(f'interference_ini: {10 * math.log10(interference_ini)}')
-        interference_channel: float = self.channel_interference(bu)
-
-        self.append_undo(lambda origin=bu.sinr: setattr(bu, 'sinr', origin))
-        sinr = power_rx / (
-                interference_noma + interference_ini + interference_cross + interference_channel + self.awgn_noise)  # ratio
-        bu.sinr = 10 * math.log10(sinr)  # ratio to dB
-        # print(f'BU SINR: {bu.sinr}')
-        bu.is_to_recalculate_sinr = False
+        self.append_undo(lambda b_l=bu_list, origin=[bu.sinr for bu in bu_list]: [
+            setattr(bu, 'sinr', sinr) for bu, sinr in zip(b_l, origin)])
+        for bu, sinr in zip(bu_list, self.engine.sinr_bu(bu_list)):
+            bu.sinr = sinr
+            bu.is_to_recalculate_sinr = False
 
     def channel_interference(self, bu: BaseUnit) -> float:
         """
         The interference from far away BSs using the same channel.
         Assume the BSs are all eNB.
         """
-        if bu.layer.nodeb.nb_type == NodeBType.E:
-            channel: int = bu.absolute_i
-        else:
-            channel: int = bu.absolute_i + self.cochannel_index['e_freq'] - self.cochannel_index['co_bandwidth']
-
-        interference: float = 0.0
-        for bs in self.channel_bs[channel]:
-            dist: float = bs.calc_distance(bs, bu.within_rb.ue.coordinate)
-            interference += self.power_rx(NodeBType.E, 46, dist)
-        # if interference:
-        # print(f'interference_BSs: {10 * math.log10(interference)}')
-
-        return interference
+        return float(self.engine.channel_interference((bu,))[0])
 
     def gen_channel_interference(self) -> Tuple[List[Coordinate], ...]:
         """
@@ -158,42 +159,133 @@ class ChannelModel(Undo):
 
         return interference_info
 
-    def power_rx(self, tx_nb_type: NodeBType, power_tx: float, distance: float) -> float:
+    def _index_channel_bs(self) -> Tuple[List[Coordinate], np.ndarray]:
+        """
+        :return: The distinct BSs, and the (channel x BS) index of them.
+                 A channel using less BSs is padded by len(bs_list).
+        """
+        bs_list: List[Coordinate] = []
+        bs_index: Dict[int, int] = {}  # id(BS): index in bs_list
+        for bs in (bs for channel in self.channel_bs for bs in channel):
+            if id(bs) not in bs_index:
+                bs_index[id(bs)] = len(bs_list)
+                bs_list.append(bs)
+
+        channel_bs_index: np.ndarray = np.full(
+            (len(self.channel_bs), max((len(channel) for channel in self.channel_bs), default=0)), len(bs_list),
+            dtype=np.intp)
+        for i, channel in enumerate(self.channel_bs):
+            channel_bs_index[i, :len(channel)] = [bs_index[id(bs)] for bs in channel]
+        return bs_list, channel_bs_index
+
+    def channel_interference_array(self, channel_list: Sequence[int], ue_list: Sequence[UserEquipment]
+                                   ) -> np.ndarray:
+        """
+        The interference from far away BSs using the same channel, for the (channel, UE) pairs, in mW.
+        The interference of a UE on every channel is calculated the first time the UE is evaluated.
+        """
+        if not channel_list:
+            return np.zeros(0)
+        col: List[int] = []
+        for ue in ue_list:
+            if (ue_index := self._channel_ue_index.get(ue)) is None:
+                ue_index: int = self._add_channel_interference(ue)
+            col.append(ue_index)
+        return self._channel_interference_table[list(channel_list), col]
+
+    def _add_channel_interference(self, ue: UserEquipment) -> int:
+        """Add the UE to the (channel x UE) interference table."""
+        ue_index: int = len(self._channel_ue_index)
+        self._channel_ue_index[ue] = ue_index
+        if ue_index == self._channel_interference_table.shape[1]:
+            self._channel_interference_table: np.ndarray = np.concatenate(
+                (self._channel_interference_table, np.empty((len(self.channel_bs), max(ue_index, 16)))), axis=1)
+
+        # the power of each BS, and 0 mW for the padding
+        power: np.ndarray = np.array(
+            [self.power_rx(NodeBType.E, 46, Coordinate.calc_distance(bs, ue.coordinate)) for bs in self._bs_list]
+            + [0.0])
+        interference: np.ndarray = np.zeros(len(self.channel_bs))
+        for k in range(self._channel_bs_index.shape[1]):  # sum in the order of self.channel_bs
+            interference += power[self._channel_bs_index[:, k]]
+        self._channel_interference_table[:, ue_index] = interference
+        return ue_index
+
+    def build_power_rx_table(self, nb_list: Iterable[NodeB], ue_list: Iterable[UserEquipment]):
+        """
+        Calculate the rx power of every (NodeB, UE) link once, after the UEs are registered to the NodeBs.
+        The distance of a UE to a NodeB doesn't change, so neither does the rx power.
+        NodeBs and UEs which are already in the table are skipped.
+        """
+        for nodeb in nb_list:
+            self._nb_index.setdefault(nodeb, len(self._nb_index))
+        for ue in ue_list:
+            self._ue_index.setdefault(ue, len(self._ue_index))
+        num_nb, num_ue = self._power_rx_table.shape
+        if (num_nb, num_ue) == (len(self._nb_index), len(self._ue_index)):
+            return True
+
+        table: np.ndarray = np.full((len(self._nb_index), len(self._ue_index)), np.nan)
+        table[:num_nb, :num_ue] = self._power_rx_table
+        shadowing: np.ndarray = self.shadowing.table(len(self._nb_index), len(self._ue_index))
+        for nodeb, row in self._nb_index.items():
+            distance: str = 'distance_gnb' if nodeb.nb_type == NodeBType.G else 'distance_enb'
+            for ue, col in self._ue_index.items():
+                if row >= num_nb or col >= num_ue:
+                    table[row, col] = self.power_rx(nodeb.nb_type, nodeb.power_tx, getattr(ue.coordinate, distance),
+                                                    float(shadowing[row, col]))
+        self._power_rx_table: np.ndarray = table
+        self._nb_is_gnb: np.ndarray = np.array([nodeb.nb_type == NodeBType.G for nodeb in self._nb_index], dtype=bool)
+
+    def link_index(self, nodeb: NodeB, ue: UserEquipment) -> Tuple[int, int]:
+        """The position of the link in the rx power table. A new NodeB or UE is added to the table lazily."""
+        if nodeb not in self._nb_index or ue not in self._ue_index:
+            self.build_power_rx_table((nodeb,), (ue,))
+        return self._nb_index[nodeb], self._ue_index[ue]
+
+    def link_power_rx(self, nodeb: NodeB, ue: UserEquipment) -> float:
+        """The rx power(mW) of the UE from the NodeB."""
+        link: Tuple[int, int] = self.link_index(nodeb, ue)
+        return float(self._power_rx_table[link])
+
+    def mcs_ceiling(self, nodeb: NodeB, ue: UserEquipment) -> Union[E_MCS, G_MCS]:
+        """
+        The interference-free MCS of the UE in the NodeB, SINR = rx power / awgn.
+        Interference only lowers the SINR, so no RB of the UE in the NodeB ever has a higher MCS.
+        Calculated once for each link.
+        """
+        link: Tuple[int, int] = self.link_index(nodeb, ue)
+        if (mcs := self._mcs_ceiling.get(link)) is None:
+            sinr: float = 10 * math.log10(float(self._power_rx_table[link]) / self.awgn_noise)  # ratio to dB
+            mcs: Union[E_MCS, G_MCS] = nodeb.nb_type.to_mcs.sinr_to_mcs(sinr)
+            self._mcs_ceiling[link] = mcs
+        return mcs
+
+    def link_power_rx_array(self, nb_index: Sequence[int], ue_index: Sequence[int]) -> np.ndarray:
+        """The rx power(mW) of the links (nb_index[k], ue_index[k]). The indices are from link_index()."""
+        return self._power_rx_table[np.asarray(nb_index, dtype=np.intp), np.asarray(ue_index, dtype=np.intp)]
+
+    def nb_is_gnb(self, nb_index: Sequence[int]) -> np.ndarray:
+        """If the NodeBs are gNBs. The indices are from link_index()."""
+        return self._nb_is_gnb[np.asarray(nb_index, dtype=np.intp)]
+
+    def power_rx(self, tx_nb_type: NodeBType, power_tx: float, distance: float,
+                 shadowing: Optional[float] = None) -> float:
         """
         Calculate the degraded signal transmitted by the BS to the UE.
         rx power(dBm) = tx power(dBm) - path loss(dB) - shadowing(dB)
         :param tx_nb_type: The signal is transmitted by tx_nb.
         :param power_tx: The transmit power.
         :param distance: in km. The distance from the BS to the UE.
+        :param shadowing: in dB. The shadowing of the link, default by self.shadowing.
         :return power_rx: in mW. The receive power from BS of UE.
         """
-        path_loss: float = self._path_loss_marco(
-            distance)  # if tx_nb_type == NodeBType.E else self._path_loss_mirco(distance)
-        power_rx: float = power_tx - path_loss - self.noise(8)  # dBm
+        if shadowing is None:
+            shadowing: float = self.shadowing.default
+        path_loss: float = self.path_loss[tx_nb_type].path_loss(distance)
+        power_rx: float = power_tx - path_loss - shadowing  # dBm
         return pow(10, power_rx / 10)  # dBm to mW
 
-    @staticmethod
-    def _path_loss_marco(distance: float) -> float:
-        """
-        A UMa (urban macro-cell) outdoor path loss model.
-        ref: TR 36.931 v13.0.0
-        :param distance: in kilometer
-        :return path loss: in dB
-        """
-        return 128.1 + 37.6 * math.log10(distance)  # dB
-
-    @staticmethod
-    def _path_loss_mirco(distance: float) -> float:
-        """
-        A UMi (urban micro-cell) outdoor path loss model.
-        ref: Proportional Fairness through Dual Connectivity in Heterogeneous Networks
-             Dual-Connectivity Enabled Resource Allocation Approach With eICIC
-             for Throughput Maximization in HetNets With Backhaul Constraint.
-        :param distance: in kilometer
-        :return path loss: in dB
-        """
-        return 140.7 + 36.7 * math.log10(distance)  # dB
-
     @property
     def awgn_noise(self) -> float:
         """
@@ -206,29 +298,3 @@ class ChannelModel(Undo):
         bandwidth: int = 180_000  # Hz, for a BU
         noise_power: float = power_spectral_density + 10 * math.log10(bandwidth)  # dBm
         return pow(10, noise_power / 10)  # dBm to mW
-
-    def noise(self, noise_variance: int) -> float:
-        random.seed('foobar')
-        seed: int = 0 - random.randint(1, 100)
-        slevel: float = 0.0
-        runiform: List[float] = [0.0, 0.0]
-        while slevel < 1.0:
-            runiform[0]: float = self.bsd_rand(seed)
-            runiform[1]: float = self.bsd_rand(seed)
-            runiform[0]: float = 2.0 * runiform[0] - 1.0
-            runiform[1]: float = 2.0 * runiform[1] - 1.0
-            slevel: float = runiform[0] * runiform[0] + runiform[1] * runiform[1]
-
-        log_value: float = math.log10(slevel)
-        stemp: float = 2 * log_value / slevel  # used "-2" in Wang's C code
-        noise: float = math.sqrt(noise_variance) * runiform[0] * math.sqrt(stemp)
-        return noise  # dB
-
-    @staticmethod
-    def bsd_rand(seed: int) -> float:
-        """
-        LCG(Linear congruential generator)
-        https://rosettacode.org/wiki/Linear_congruential_generator#Python
-        """
-        seed: float = (1103515245 * seed + 12345) & 0x7fffffff
-        return seed
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from src.resource_allocation.ds.util_enum import NodeBType
+
+if TYPE_CHECKING:
+    from src.channel_model.sinr import ChannelModel
+    from src.resource_allocation.ds.frame import BaseUnit
+    from src.resource_allocation.ds.nodeb import NodeB
+    from src.resource_allocation.ds.rb import ResourceBlock
+    from src.resource_allocation.ds.ue import UserEquipment
+
+
+Link = Tuple['NodeB', 'UserEquipment', int]  # (NodeB, UE, frequency of the numerology)
+
+
+class SINREngine:
+    """
+    Calculate the SINR of a batch of BUs (a whole RB, UE or layer) in one pass.
+    Every (BU, overlapped RB) pair is gathered into flat arrays, the rx power of the links is read from
+    the (NodeB x UE) table and the co-channel BS interference from the (channel x UE) table of the channel model.
+    The interference of the overlapped RBs is summed in the order of BaseUnit.overlapped_rb,
+    the same float sums as calculating a BU alone.
+    """
+
+    def __init__(self, channel_model: ChannelModel):
+        self.channel_model: ChannelModel = channel_model
+        self._memo: WeakKeyDictionary[ResourceBlock, Dict[Tuple, float]] = WeakKeyDictionary()
+
+    def sinr_bu(self, bu_list: Sequence[BaseUnit]) -> List[float]:
+        """
+        The BUs with the same interference signature, (serving RB, links of the overlapped RBs, channel),
+        have the same SINR. Only one BU of each signature is calculated, and the result is memoized for the next time.
+        The signature is everything the SINR depends on,
+        when _effect_others() or undo changes the overlapped RBs of a BU, the BU has another signature,
+        so the memo never has to be invalidated.
+        The signature holds the links instead of the overlapped RBs, so a removed RB isn't kept alive by the memo,
+        and the memo of a RB is dropped with the RB.
+        :param bu_list: The BUs to calculate. Every BU should be used by a RB.
+        :return: The SINR of the BUs in dB, in the order of bu_list.
+        """
+        sinr: List[Optional[float]] = []
+        to_calc: Dict[Tuple[ResourceBlock, Tuple], List[int]] = {}  # signature: the index of the BUs in bu_list
+        link = self.link
+        for k, bu in enumerate(bu_list):
+            rb: ResourceBlock = bu.within_rb
+            signature: Tuple = (tuple(map(link, bu.overlapped_rb)), self.channel(bu))
+            if (memo := self._memo.get(rb)) is None:
+                memo: Dict[Tuple, float] = {}
+                self._memo[rb] = memo
+            sinr.append(memo.get(signature))
+            if sinr[-1] is None:
+                to_calc.setdefault((rb, signature), []).append(k)
+
+        if to_calc:
+            calc: List[float] = self._sinr_bu([bu_list[k[0]] for k in to_calc.values()])
+            for ((rb, signature), bu_index), sinr_signature in zip(to_calc.items(), calc):
+                self._memo[rb][signature] = sinr_signature
+                for k in bu_index:
+                    sinr[k] = sinr_signature
+        return sinr
+
+    def _sinr_bu(self, bu_list: Sequence[BaseUnit]) -> List[float]:
+        """
+        SINR(ratio) = rx power(mW) / (noma(mW) + ini(mW) + cross-tier(mW) + interference from other BSs(mW) + awgn(mW))
+        The NOMA, INI and cross-tier interference of a BU are running totals,
+        only the overlapped RBs placed since the last calculation are added, see BaseUnit._effect_others().
+        :param bu_list: The BUs to calculate. Every BU should be used by a RB.
+        :return: The SINR of the BUs in dB, in the order of bu_list.
+        """
+        num_bu: int = len(bu_list)
+        if num_bu == 0:
+            return []
+        bu_nb: List[int] = []  # the (NodeB, UE) link of the BU in the rx power table
+        bu_ue: List[int] = []
+        bu_freq: List[int] = []
+        pair_bu: List[int] = []  # the index of the BU in bu_list
+        pair_nb: List[int] = []  # the link of the overlapped RB, (its' NodeB, its' UE)
+        pair_ue: List[int] = []
+        pair_freq: List[int] = []
+        interference: List[Tuple[float, float, float]] = []  # the running NOMA, INI and cross-tier interference
+        link_index = self.channel_model.link_index
+        for k, bu in enumerate(bu_list):
+            rb = bu.within_rb
+            nb, ue = link_index(bu.layer.nodeb, rb.ue)
+            bu_nb.append(nb)
+            bu_ue.append(ue)
+            bu_freq.append(rb.numerology.freq)
+            if bu.interference is None:
+                interference.append((0.0, 0.0, 0.0))
+                delta: Iterable[ResourceBlock] = bu.overlapped_rb
+            else:
+                interference.append(bu.interference)
+                delta: Iterable[ResourceBlock] = bu.interference_delta
+            for overlapped_rb in delta:
+                nb, ue = link_index(overlapped_rb.layer.nodeb, overlapped_rb.ue)
+                pair_bu.append(k)
+                pair_nb.append(nb)
+                pair_ue.append(ue)
+                pair_freq.append(overlapped_rb.numerology.freq)
+
+        power_rx: np.ndarray = self.channel_model.link_power_rx_array(bu_nb, bu_ue)
+        interference: np.ndarray = self._sum_interference(
+            power_rx, np.array(interference, dtype=np.float64), np.array(bu_nb), np.array(bu_ue),
+            np.array(bu_freq), np.array(pair_bu, dtype=np.intp), np.array(pair_nb), np.array(pair_ue),
+            np.array(pair_freq))
+        for bu, bu_interference in zip(bu_list, interference.tolist()):
+            bu.update_interference(tuple(bu_interference))
+        return self._to_sinr(power_rx, interference, self.channel_interference(bu_list))
+
+    def _sum_interference(self, power_rx: np.ndarray, interference: np.ndarray, bu_nb: np.ndarray,
+                          bu_ue: np.ndarray, bu_freq: np.ndarray, pair_bu: np.ndarray, pair_nb: np.ndarray,
+                          pair_ue: np.ndarray, pair_freq: np.ndarray) -> np.ndarray:
+        """
+        Add the interference of every (BU, overlapped RB) pair to the running totals of the BU.
+        np.bincount() adds the weights one by one in the order given, and the totals of the BUs are put first,
+        so each total is the same float sum as adding its' pairs in a loop. np.sum() is pairwise and isn't.
+        :param interference: The (BU x (NOMA, INI, cross-tier)) running totals before the pairs.
+        :return: The (BU x (NOMA, INI, cross-tier)) totals after the pairs.
+        """
+        if pair_bu.size == 0:
+            return interference
+        num_bu: int = len(power_rx)
+        pair_power_rx: np.ndarray = self.channel_model.link_power_rx_array(pair_nb, pair_ue)
+        # the UE of the BU from the NodeB of the overlapped RB
+        pair_interference: np.ndarray = self.channel_model.link_power_rx_array(pair_nb, bu_ue[pair_bu])
+        pair_is_gnb: np.ndarray = self.channel_model.nb_is_gnb(pair_nb)
+        bu_is_gnb: np.ndarray = self.channel_model.nb_is_gnb(bu_nb)[pair_bu]
+        is_interfered: Tuple[np.ndarray, ...] = (
+            # NOMA interference, compared by power because every UE has the same tx power
+            pair_is_gnb & bu_is_gnb & (power_rx[pair_bu] < pair_power_rx),
+            pair_freq != bu_freq[pair_bu],  # inter-numerology interference
+            pair_is_gnb != bu_is_gnb)  # cross-tier interference
+
+        index: np.ndarray = np.concatenate((np.arange(num_bu, dtype=np.intp), pair_bu))
+        return np.stack([np.bincount(index, minlength=num_bu,
+                                     weights=np.concatenate((interference[:, t],
+                                                             np.where(is_interfered[t], pair_interference, 0.0))))
+                         for t in range(3)], axis=1)
+
+    def _to_sinr(self, power_rx: np.ndarray, interference: np.ndarray,
+                 interference_channel: np.ndarray) -> List[float]:
+        sinr: np.ndarray = power_rx / (
+                interference[:, 0] + interference[:, 1] + interference[:, 2] + interference_channel
+                + self.channel_model.awgn_noise)  # ratio
+        # math.log10 instead of np.log10 to keep the last digit the same as the scalar calculation
+        return [10 * math.log10(s) for s in sinr.tolist()]  # ratio to dB
+
+    def channel_interference(self, bu_list: Sequence[BaseUnit]) -> np.ndarray:
+        """
+        The interference from far away BSs using the same channel, for every BU in bu_list.
+        Assume the BSs are all eNB.
+        """
+        return self.channel_model.channel_interference_array([self.channel(bu) for bu in bu_list],
+                                                             [bu.within_rb.ue for bu in bu_list])
+
+    @staticmethod
+    def link(rb: ResourceBlock) -> Link:
+        """The (NodeB, UE, frequency of the numerology) of a RB, which is all the SINR of its BUs depends on."""
+        return rb.layer.nodeb, rb.ue, rb.numerology.freq
+
+    def channel(self, bu: BaseUnit) -> int:
+        """The channel of the BU, counted from the lowest frequency of the eNB and gNB."""
+        if bu.layer.nodeb.nb_type == NodeBType.E:
+            return bu.absolute_i
+        cochannel_index: Dict = self.channel_model.cochannel_index
+        return bu.absolute_i + cochannel_index['e_freq'] - cochannel_index['co_bandwidth']
+
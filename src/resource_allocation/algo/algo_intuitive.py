@@ -3,7 +3,7 @@ from typing import List, Optional, Set, Tuple, Union
 from src.channel_model.sinr import ChannelModel
 from src.resource_allocation.algo.new_single_ue import AllocateUE, DCProportionAllocate
 from src.resource_allocation.algo.new_ue_list import AllocateUEList
-from src.resource_allocation.algo.utils import sort_by_channel_quality
+from src.resource_allocation.algo.utils import may_be_fulfilled, sort_by_channel_quality
 from src.resource_allocation.ds.eutran import ENodeB, EUserEquipment
 from src.resource_allocation.ds.frame import BaseUnit
 from src.resource_allocation.ds.ngran import DUserEquipment, GNodeB, GUserEquipment
@@ -49,15 +49,21 @@ class Intuitive(AllocateUEList):
                     return False
 
             allocate_ue: DCProportionAllocate = DCProportionAllocate(ue, self.channel_model)
+            request: Tuple[float, float] = allocate_ue.calc_request_proportion((self.nb, self.another_nb))
+            if not all(may_be_fulfilled(ue, spaces, self.channel_model, request_data_rate=r)
+                       for spaces, r in zip(space_in_nbs, request)):
+                return False  # fails even without interference
             is_allocated: bool = allocate_ue.allocate(tuple(space_in_nbs))
         else:
             spaces: Tuple[Space, ...] = self.update_empty_space(self.nb, ue)
             if not spaces:  # run out of space
                 return False
+            if not may_be_fulfilled(ue, spaces, self.channel_model):
+                return False  # fails even without interference
 
             allocate_ue: AllocateUE = AllocateUE(ue, spaces, self.channel_model)
             is_allocated: bool = allocate_ue.allocate()
-        self.append_undo(lambda a_u=allocate_ue: a_u.undo(), lambda a_u=allocate_ue: a_u.purge_undo())
+        self.append_undo_nested(allocate_ue)
         return is_allocated
 
     @staticmethod
@@ -156,20 +162,15 @@ class Intuitive(AllocateUEList):
         last_numerology: Union[Numerology, LTEResourceBlock] = last_rb.numerology
         row_start: int = freq - last_numerology.freq + 1
         assert nb.frame.layer[layer].bu_status[row_start][time], 'Algorithm error.'
-        col_end: int = time
-        for t in range(time + 1, nb.frame.frame_time):
-            if nb.frame.layer[layer].bu_status[row_start][t] is True:
-                col_end: int = t
+        col_end: int = nb.frame.layer[layer].row_mask[row_start].bit_length() - 1  # the last used BU in the row
         assert nb.frame.layer[layer].bu_status[row_start][col_end], 'Algorithm error.'
         return layer, row_start, col_end
 
     @staticmethod
     def find_latest_bu(nb: Union[GNodeB, ENodeB]) -> Tuple[int, int, int]:
         for l in range(nb.frame.max_layer - 1, -1, -1):
-            for f in range(nb.frame.frame_freq - 1, -1, -1):
-                for t in range(nb.frame.frame_time - 1, -1, -1):
-                    if nb.frame.layer[l].bu_status[f][t] is True:
-                        return l, f, t
+            if last_used := nb.frame.layer[l].last_used():
+                return l, last_used[0], last_used[1]
         return -1, -1, -1  # empty NB
 
     @staticmethod
@@ -26,11 +26,13 @@ class FRSAPhase3(Undo):
 
     def adjust_effected_ue(self, allocated_ue: List[UE]):
         while True:
+            self.channel_model.sinr_ue_batch([ue for ue in allocated_ue if ue.is_to_recalculate_mcs])
             is_all_adjusted: bool = True
             for ue in allocated_ue:
                 if ue.is_to_recalculate_mcs:
                     is_all_adjusted: bool = False
-                    self.channel_model.sinr_ue(ue)
+                    # refresh the BUs changed by the RBs removed or added for the UEs before it in this sweep
+                    self.channel_model.sinr_ue_batch((ue,))
                     AdjustMCS().remove_from_tail(ue, channel_model=self.channel_model)
                     if not ue.is_allocated:
                         allocated_ue.remove(ue)
@@ -45,9 +45,7 @@ class MaxSubarray(Undo):
         super().__init__()
         assert ue_nb_info.rb, "Input empty list."
         self.ue_nb_info: Union[GNBInfo, ENBInfo] = ue_nb_info
-        self.ue_nb_info.rb.sort(key=lambda x: x.j_start)  # sort by time
-        self.ue_nb_info.rb.sort(key=lambda x: x.i_start)  # sort by freq
-        self.ue_nb_info.rb.sort(key=lambda x: x.layer.layer_index)  # sort by layer
+        self.ue_nb_info.rb.sort(key=lambda x: (x.layer.layer_index, x.i_start, x.j_start))  # by layer, freq and time
         self.mcs_list: Union[List[G_MCS], List[E_MCS]] = [rb.mcs for rb in self.ue_nb_info.rb]
 
         # The index range of the RBs to move to the other BS
@@ -118,9 +116,8 @@ class MaxSubarray(Undo):
         # remove the RBs that makes MCS worst
         from_l_or_r: int = 0 if self.rm_from == 0 else -1  # remove left half when rm_to == 0 else right
         for _ in range(self.rm_to - self.rm_from):
-            self.append_undo(lambda rb=self.ue_nb_info.rb[from_l_or_r]: rb.undo(),
-                             lambda rb=self.ue_nb_info.rb[from_l_or_r]: rb.purge_undo())
+            self.append_undo_nested(self.ue_nb_info.rb[from_l_or_r])
             self.ue_nb_info.rb[from_l_or_r].remove_rb()
-        self.append_undo(lambda origin=self.ue_nb_info.mcs: setattr(self.ue_nb_info, 'mcs', origin))
+        self.append_undo_attr(self.ue_nb_info, 'mcs', self.ue_nb_info.mcs)
         self.ue_nb_info.update_mcs()
         return True
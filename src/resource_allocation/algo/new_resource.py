@@ -61,7 +61,7 @@ class NewResource(Undo):
 
         # allocate a RB in the space
         new_rb: Optional[ResourceBlock] = last_rb.layer.allocate_resource_block(next_rb[0], next_rb[1], ue)
-        self.append_undo(lambda l=last_rb.layer: l.undo(), lambda l=last_rb.layer: l.purge_undo())
+        self.append_undo_nested(last_rb.layer)
         if new_rb is None:  # allocation failed
             self.end_func_undo()
             self.purge_undo()
@@ -70,7 +70,7 @@ class NewResource(Undo):
         # the SINR of the new RB
         assert channel_model is not None, "Channel model isn't passed in."
         channel_model.sinr_rb(new_rb)
-        self.append_undo(lambda: channel_model.undo(), lambda: channel_model.purge_undo())
+        self.append_undo_nested(channel_model)
 
         self.end_func_undo()
 
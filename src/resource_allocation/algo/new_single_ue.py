@@ -70,23 +70,22 @@ class AllocateUE(Undo):
 
             # allocate a new RB
             rb: Optional[ResourceBlock] = space.layer.allocate_resource_block(bu_i, bu_j, self.ue)
-            self.append_undo(lambda l=space.layer: l.undo(), lambda l=space.layer: l.purge_undo())
+            self.append_undo_nested(space.layer)
             if not rb:
                 # overlapped with itself
                 return False
 
             self.channel_model.sinr_rb(rb)
-            self.append_undo(lambda: self.channel_model.undo(), lambda: self.channel_model.purge_undo())
+            self.append_undo_nested(self.channel_model)
             if rb.mcs is (G_MCS if nb_info.nb_type == NodeBType.G else E_MCS).CQI0:
                 # SINR out of range
                 return False
 
             # check if the allocated RBs fulfill request data rate
             if self.is_fulfilled(nb_info):
-                self.append_undo(lambda origin=nb_info.mcs: setattr(nb_info, 'mcs', origin))
-                self.append_undo(lambda origin=self.ue.throughput: setattr(self.ue, 'throughput', origin))
-                self.append_undo(
-                    lambda origin=self.ue.is_to_recalculate_mcs: setattr(self.ue, 'is_to_recalculate_mcs', origin))
+                self.append_undo_attr(nb_info, 'mcs', nb_info.mcs)
+                self.append_undo_attr(self.ue, 'throughput', self.ue.throughput)
+                self.append_undo_attr(self.ue, 'is_to_recalculate_mcs', self.ue.is_to_recalculate_mcs)
 
                 nb_info.update_mcs()
                 self.ue.update_throughput()
@@ -97,7 +96,7 @@ class AllocateUE(Undo):
         if self.request is None:
             return self.ue.calc_throughput() >= self.ue.request_data_rate
         else:  # has input request
-            return (min(nb_info.rb, key=lambda rb: rb.mcs.value).mcs.value * len(nb_info.rb)) >= self.request
+            return nb_info.rb.throughput() >= self.request
 
     def next_space(self) -> Optional[Tuple[Space, int, int]]:
         while self.spaces:
@@ -153,13 +152,13 @@ class DCProportionAllocate(Undo):
             is_allocated: bool = allocate_ue.allocate()
         except ThroughputError:
             pass
-        self.append_undo(lambda a_u=allocate_ue: a_u.undo(), lambda a_u=allocate_ue: a_u.purge_undo())
+        self.append_undo_nested(allocate_ue)
         return is_allocated
 
     def adjust_mcs(self):
         adjust_mcs: AdjustMCS = AdjustMCS()
         has_succeed: bool = adjust_mcs.remove_from_tail(self.ue)
-        self.append_undo(lambda a_m=adjust_mcs: a_m.undo(), lambda a_m=adjust_mcs: a_m.purge_undo())
+        self.append_undo_nested(adjust_mcs)
         return has_succeed
 
     def calc_request_proportion(self, nbs: Tuple[NodeB, NodeB]) -> Tuple[float, float]:
@@ -174,15 +173,7 @@ class DCProportionAllocate(Undo):
         ), 'Should input two different types of BSs.'
 
         # calculate the proportion
-        rx_power_nb: List[float] = []
-        for nb in nbs:
-            if nb.nb_type == NodeBType.G:
-                rx_power: float = self.channel_model.power_rx(nb.nb_type, nb.power_tx, self.ue.coordinate.distance_gnb)
-            elif nb.nb_type == NodeBType.E:
-                rx_power: float = self.channel_model.power_rx(nb.nb_type, nb.power_tx, self.ue.coordinate.distance_enb)
-            else:
-                raise AssertionError
-            rx_power_nb.append(rx_power)
+        rx_power_nb: List[float] = [self.channel_model.link_power_rx(nb, self.ue) for nb in nbs]
         total: float = rx_power_nb[0] + rx_power_nb[1]
         proportion: List[float] = [i / total for i in rx_power_nb]
 
@@ -4,7 +4,7 @@ from src.channel_model.adjust_mcs import AdjustMCS
 from src.channel_model.sinr import ChannelModel
 from src.resource_allocation.algo.new_single_ue import AllocateUE
 from src.resource_allocation.algo.util_type import RBIndex
-from src.resource_allocation.algo.utils import calc_system_throughput, sort_by_channel_quality
+from src.resource_allocation.algo.utils import calc_system_throughput, may_be_fulfilled, sort_by_channel_quality
 from src.resource_allocation.ds.eutran import ENodeB, EUserEquipment
 from src.resource_allocation.ds.frame import BaseUnit, Layer
 from src.resource_allocation.ds.ngran import DUserEquipment, GNodeB, GUserEquipment
@@ -46,6 +46,8 @@ class AllocateUEList(Undo):
             is_allocated: bool = False
             # assert not ue.is_allocated    # TODO: refactor, for MCUP combine RA algorithms
             for space in spaces:
+                if not may_be_fulfilled(ue, (space,), self.channel_model):
+                    continue  # fails even without interference
                 # from tests.assertion import check_undo_copy
                 # copy_ue = check_undo_copy([ue] + self.gue_allocated + self.due_allocated + self.eue_allocated)
                 is_allocated: bool = self._allocate(ue, (space,), allow_lower_mcs, allow_lower_than_cqi0)
@@ -85,7 +87,7 @@ class AllocateUEList(Undo):
     def allocate_one_ue(self, ue: UE, spaces: Tuple[Space, ...]) -> bool:
         allocate_ue: AllocateUE = AllocateUE(ue, spaces, self.channel_model)
         is_allocated: bool = allocate_ue.allocate()
-        self.append_undo(lambda a_u=allocate_ue: a_u.undo(), lambda a_u=allocate_ue: a_u.purge_undo())
+        self.append_undo_nested(allocate_ue)
         return is_allocated
 
     @staticmethod
@@ -106,12 +108,16 @@ class AllocateUEList(Undo):
         self.assert_undo_function()
         self.assert_allow_lower(allow_lower_mcs, allow_lower_than_cqi0)
         while True:
+            self.channel_model.sinr_ue_batch([ue for ue in allocated_ue if ue.is_to_recalculate_mcs])
+            self.append_undo_nested(self.channel_model)
             is_all_adjusted: bool = True
             for ue in allocated_ue:
                 if ue.is_to_recalculate_mcs:
                     is_all_adjusted: bool = False
-                    self.channel_model.sinr_ue(ue)
-                    self.append_undo(lambda: self.channel_model.undo(), lambda: self.channel_model.purge_undo())
+                    # adjust_mcs() of an earlier UE in this sweep may have removed or added RBs over this UE,
+                    # refresh the BUs it changed before the MCS of this UE is read
+                    self.channel_model.sinr_ue_batch((ue,))
+                    self.append_undo_nested(self.channel_model)
 
                     has_positive_effect: bool = self.adjust_mcs(ue, allow_lower_mcs, allow_lower_than_cqi0)
                     if allow_lower_mcs and allow_lower_than_cqi0 and not ue.is_allocated:  # the ue can be removed
@@ -138,7 +144,7 @@ class AllocateUEList(Undo):
             has_positive_effect: bool = adjust_mcs.remove_from_tail(ue,
                                                                     allow_lower_mcs=True, allow_lower_than_cqi0=True,
                                                                     channel_model=self.channel_model)
-        self.append_undo(lambda a_m=adjust_mcs: a_m.undo(), lambda a_m=adjust_mcs: a_m.purge_undo())
+        self.append_undo_nested(adjust_mcs)
         return has_positive_effect
 
     @staticmethod
@@ -172,7 +178,9 @@ class AllocateUEListSameNumerology(AllocateUEList):
             is_allocated: bool = False
             bu: RBIndex = RBIndex(layer=0, i=0, j=-1)
             self.empty_spaces: List[Space] = list(self.update_empty_space(self.nb))
-            while bu_start := self.next_available_space(bu, ue.numerology_in_use):
+            # out of the range of the BS, every RB is CQI0 even without interference
+            is_in_range: bool = self.channel_model.mcs_ceiling(self.nb, ue) is not self.nb.nb_type.to_mcs.CQI0
+            while is_in_range and (bu_start := self.next_available_space(bu, ue.numerology_in_use)):
                 # from utils.assertion import check_undo_copy
                 # copy_ue = check_undo_copy([ue] + self.allocated_ue)
                 self.start_func_undo()
@@ -210,22 +218,22 @@ class AllocateUEListSameNumerology(AllocateUEList):
         while True:
             # allocate a new RB
             rb: Optional[ResourceBlock] = layer.allocate_resource_block(bu.i, bu.j, ue)
-            self.append_undo(lambda l=layer: l.undo(), lambda l=layer: l.purge_undo())
+            self.append_undo_nested(layer)
             if not rb:
                 # overlapped with itself
                 return False, bu
 
             self.channel_model.sinr_rb(rb)
-            self.append_undo(lambda: self.channel_model.undo(), lambda: self.channel_model.purge_undo())
+            self.append_undo_nested(self.channel_model)
             if rb.mcs is (G_MCS if nb_info.nb_type == NodeBType.G else E_MCS).CQI0:
                 # SINR out of range
                 return False, bu
 
             # check if the allocated RBs fulfill request data rate
             if ue.calc_throughput() >= ue.request_data_rate:
-                self.append_undo(lambda origin=nb_info.mcs: setattr(nb_info, 'mcs', origin))
-                self.append_undo(lambda origin=ue.throughput: setattr(ue, 'throughput', origin))
-                self.append_undo(lambda origin=ue.is_to_recalculate_mcs: setattr(ue, 'is_to_recalculate_mcs', origin))
+                self.append_undo_attr(nb_info, 'mcs', nb_info.mcs)
+                self.append_undo_attr(ue, 'throughput', ue.throughput)
+                self.append_undo_attr(ue, 'is_to_recalculate_mcs', ue.is_to_recalculate_mcs)
 
                 nb_info.update_mcs()
                 ue.update_throughput()
@@ -273,7 +281,7 @@ class AllocateUEListSameNumerology(AllocateUEList):
         else:
             raise AssertionError
 
-        self.append_undo(lambda a_m=adjust_mcs: a_m.undo(), lambda a_m=adjust_mcs: a_m.purge_undo())
+        self.append_undo_nested(adjust_mcs)
         return has_positive_effect
 
     def next_available_space(self, bu: RBIndex, numerology: Union[Numerology, LTEResourceBlock]) -> Optional[RBIndex]:
@@ -310,13 +318,15 @@ class AllocateUEListSameNumerology(AllocateUEList):
             elif space.layer.layer_index == next_bu.layer:
                 if space.ending_i >= next_bu.i:
                     for i in range(max(next_bu.i, space.starting_i), space.ending_i + 1):
-                        for j in range(space.starting_j, space.ending_j + 1):
-                            if i == next_bu.i and j < next_bu.j:
-                                continue
+                        # skip the used BUs, the RB can't start there
+                        j: int = space.layer.first_unused(
+                            i, max(space.starting_j, next_bu.j) if i == next_bu.i else space.starting_j)
+                        while j <= space.ending_j:
                             new_bu: RBIndex = RBIndex(layer=space.layer.layer_index, i=i, j=j)
                             if self.is_available_rb(new_bu, numerology, self.nb):
                                 assert new_bu != bu
                                 return new_bu
+                            j: int = space.layer.first_unused(i, j + 1)
             elif space.layer.layer_index > next_bu.layer:
                 # look in a whole space
                 if new_bu := self.is_available_space(space, numerology):
@@ -386,12 +396,13 @@ class AllocateUEListSameNumerology(AllocateUEList):
                 starting_bu.j + numerology.time > nb.frame.frame_time):
             # RB out of bound
             return False
+        if not nb.frame.layer[starting_bu.layer].is_empty(starting_bu.i, starting_bu.i + numerology.freq - 1,
+                                                          starting_bu.j, starting_bu.j + numerology.time - 1):
+            return False
 
         for i in range(starting_bu.i, starting_bu.i + numerology.freq):
             for j in range(starting_bu.j, starting_bu.j + numerology.time):
                 bu: BaseUnit = nb.frame.layer[starting_bu.layer].bu[i][j]
-                if bu.is_used:
-                    return False
                 assert len(bu.lapped_numerology) <= 1, 'Only lap with same numerology.'
                 if i == starting_bu.i and j == starting_bu.j:
                     if not (not bu.overlapped_rb or (
@@ -4,7 +4,7 @@ from src.channel_model.adjust_mcs import AdjustMCS
 from src.channel_model.sinr import ChannelModel
 from src.resource_allocation.algo.max_subarray import MaxSubarray
 from src.resource_allocation.algo.new_single_ue import AllocateUE
-from src.resource_allocation.algo.utils import calc_system_throughput
+from src.resource_allocation.algo.utils import calc_system_throughput, may_be_fulfilled
 from src.resource_allocation.ds.eutran import ENodeB, EUserEquipment
 from src.resource_allocation.ds.ngran import DUserEquipment, GNodeB, GUserEquipment
 from src.resource_allocation.ds.nodeb import ENBInfo, GNBInfo
@@ -76,8 +76,9 @@ class Phase3(Undo):
         system_throughput: float = calc_system_throughput(tuple(allocated_ue))
         while unallocated_ue and spaces:
             ue: UE = unallocated_ue.pop(0)
-            filtered_space: Tuple[Space] = self.filter_space(
-                spaces, nb.nb_type, ue.numerology_in_use, ue.request_data_rate)
+            filtered_space: Tuple[Space] = tuple(space for space in self.filter_space(
+                spaces, nb.nb_type, ue.numerology_in_use, ue.request_data_rate
+            ) if may_be_fulfilled(ue, (space,), self.channel_model))
             is_allocated: bool = False
             for space in filtered_space:
                 # from utils.assertion import check_undo_copy
@@ -109,7 +110,7 @@ class Phase3(Undo):
         # allocate new ue
         allocate_ue: AllocateUE = AllocateUE(ue, spaces, self.channel_model)
         is_allocated: bool = allocate_ue.allocate()
-        self.append_undo(lambda a_u=allocate_ue: a_u.undo(), lambda a_u=allocate_ue: a_u.purge_undo())
+        self.append_undo_nested(allocate_ue)
 
         if is_allocated:
             self.ue_cut(ue, nb_type, to_undo=True)
@@ -130,19 +131,22 @@ class Phase3(Undo):
                 return False
 
             # main
+            self.channel_model.sinr_ue_batch([ue for ue in ue_allocated if ue.is_to_recalculate_mcs])
+            self.append_undo_nested(self.channel_model) if to_undo else None
             is_all_adjusted: bool = True
             for ue in ue_allocated:
                 if ue.is_to_recalculate_mcs:
                     assert ue.is_allocated
                     is_all_adjusted: bool = False
-                    self.channel_model.sinr_ue(ue)
-                    self.append_undo(lambda: self.channel_model.undo(),
-                                     lambda: self.channel_model.purge_undo()) if to_undo else None
+                    # The UEs adjusted before this one in the sweep may have removed or added RBs over it,
+                    # so its' SINR is refreshed here, not only in the batch above. Only the BUs they changed
+                    # are recalculated.
+                    self.channel_model.sinr_ue_batch((ue,))
+                    self.append_undo_nested(self.channel_model) if to_undo else None
                     adjust_mcs: AdjustMCS = AdjustMCS()
                     is_fulfilled: bool = adjust_mcs.remove_worst_rb(ue, allow_lower_than_cqi0=False,
                                                                     channel_model=self.channel_model)
-                    self.append_undo(lambda a_m=adjust_mcs: a_m.undo(),
-                                     lambda a_m=adjust_mcs: a_m.purge_undo()) if to_undo else None
+                    self.append_undo_nested(adjust_mcs) if to_undo else None
                     if not is_fulfilled:
                         # the mcs of the ue is lowered down by another UE.
                         return False
@@ -161,6 +165,9 @@ class Phase3(Undo):
                      ue_request: float) -> Tuple[Space]:
         if nb_type == NodeBType.E:
             rb_type: LTEResourceBlock = LTEResourceBlock.E  # TODO: refactor or redesign
+        if spaces and spaces[0].layer.nodeb.frame.rb_capacity(rb_type) < (
+                G_MCS if nb_type == NodeBType.G else E_MCS).get_best().calc_required_rb_count(ue_request):
+            return ()  # none of the layers has enough unused BUs
 
         filter_spaces: List[Space] = list(spaces)
         for space in spaces:
@@ -185,7 +192,7 @@ class Phase3(Undo):
         is_cut: bool = cs.cutting(nb_info, nb_info)
         if is_cut and to_undo:
             self.assert_undo_function()
-            self.append_undo(lambda c=cs: c.undo(), lambda c=cs: c.purge_undo())
+            self.append_undo_nested(cs)
         else:
             del cs  # undo was done in CrossSpace
 
@@ -197,7 +204,7 @@ class Phase3(Undo):
         is_cut: bool = dc.cutting(nb_info, another_nb_info)
         if is_cut and to_undo:
             self.assert_undo_function()
-            self.append_undo(lambda d=dc: d.undo(), lambda d=dc: d.purge_undo())
+            self.append_undo_nested(dc)
         else:
             del dc  # undo was done in CrossSpace
 
@@ -251,11 +258,13 @@ class CrossSpace(Undo):
             # add new RBs
             if spaces:
                 for space in spaces:
+                    if not may_be_fulfilled(self.ue, (space,), self.channel_model):
+                        continue
                     allocate_ue = AllocateUE(self.ue, (space,), self.channel_model)
                     is_succeed: bool = allocate_ue.allocate()
                     if is_succeed and (another_nb_info.mcs.efficiency > origin_mcs.efficiency):
                         # resource efficiency is improved
-                        self.append_undo(lambda a_u=allocate_ue: a_u.undo(), lambda a_u=allocate_ue: a_u.purge_undo())
+                        self.append_undo_nested(allocate_ue)
                         self.adjust_mcs()   # because the new RB(s) may exceed the rate demand
                         return True
                     else:
@@ -289,7 +298,7 @@ class CrossSpace(Undo):
                 return False
 
         max_subarray.remove_rbs()
-        self.append_undo(lambda: max_subarray.undo(), lambda: max_subarray.purge_undo())
+        self.append_undo_nested(max_subarray)
         return True
 
     def space_from_another_nb_info(self, another_nb_info: Union[GNBInfo, ENBInfo]) -> Tuple[Space, ...]:
@@ -301,6 +310,6 @@ class CrossSpace(Undo):
     def adjust_mcs(self):
         adjust_mcs: AdjustMCS = AdjustMCS()
         adjust_mcs.remove_worst_rb(self.ue, channel_model=self.channel_model)
-        self.append_undo(lambda a_m=adjust_mcs: a_m.undo(), lambda a_m=adjust_mcs: a_m.purge_undo())
+        self.append_undo_nested(adjust_mcs)
         if not self.ue.is_allocated:
             raise AssertionError
@@ -1,9 +1,12 @@
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+from src.channel_model.sinr import ChannelModel
 from src.resource_allocation.ds.eutran import EUserEquipment
 from src.resource_allocation.ds.ngran import DUserEquipment, GUserEquipment
+from src.resource_allocation.ds.nodeb import ENBInfo, GNBInfo
+from src.resource_allocation.ds.space import Space
 from src.resource_allocation.ds.ue import UserEquipment
-from src.resource_allocation.ds.util_enum import NodeBType, UEType
+from src.resource_allocation.ds.util_enum import E_MCS, G_MCS, LTEResourceBlock, NodeBType, Numerology, UEType
 from utils.assertion import assert_throughput
 
 UE = Union[GUserEquipment, DUserEquipment, EUserEquipment, UserEquipment]
@@ -75,3 +78,34 @@ def sort_by_channel_quality(ue_list: List[UE], nb_type: NodeBType) -> List[UE]:
     else:
         raise AssertionError
     return ue_list
+
+
+def may_be_fulfilled(ue: UE, spaces: Tuple[Space, ...], channel_model: ChannelModel,
+                     request_data_rate: Optional[float] = None) -> bool:
+    """
+    If AllocateUE(ue, spaces) might succeed, assuming every new RB has the interference-free MCS of the UE.
+    False means the allocation fails for sure, so the spaces can be skipped without allocating and undoing.
+    :param spaces: The spaces in the same BS.
+    :param request_data_rate: The request of the BS only, as in AllocateUE. None for the request of the UE.
+    """
+    if not spaces:
+        return False
+    nb_type: NodeBType = spaces[0].layer.nodeb.nb_type
+    mcs: Union[E_MCS, G_MCS] = channel_model.mcs_ceiling(spaces[0].layer.nodeb, ue)
+    if mcs is nb_type.to_mcs.CQI0:
+        return False  # out of the range of the BS
+
+    nb_info: Union[GNBInfo, ENBInfo] = ue.gnb_info if nb_type == NodeBType.G else ue.enb_info
+    rb_type: Union[Numerology, LTEResourceBlock] = LTEResourceBlock.E if nb_type == NodeBType.E else (
+        ue.numerology_in_use)  # TODO: refactor or redesign
+    num_rb: int = len(nb_info.rb) + sum(space.num_of_rb(rb_type) for space in spaces)
+    if request_data_rate is not None:
+        return mcs.value * num_rb >= request_data_rate
+
+    # the throughput in another BS isn't changed by AllocateUE
+    throughput_another_nb: float = 0.0
+    another_nb_info: Optional[Union[GNBInfo, ENBInfo]] = getattr(
+        ue, 'enb_info' if nb_type == NodeBType.G else 'gnb_info', None)
+    if another_nb_info is not None:
+        throughput_another_nb: float = another_nb_info.rb.throughput()
+    return throughput_another_nb + mcs.value * num_rb >= ue.request_data_rate
@@ -15,6 +15,8 @@ class ENodeB(NodeB):
 
 
 class EUserEquipment(UserEquipment):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ue_type: UEType = UEType.E
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING, Union
+
+import numpy as np
 
 from .rb import ResourceBlock
 from .undo import Undo
@@ -10,6 +12,7 @@ if TYPE_CHECKING:
     from .eutran import ENodeB
     from .ngran import GNodeB
     from .nodeb import ENBInfo, GNBInfo, NodeB
+    from .space import Space
     from .ue import UserEquipment
     from .zone import Zone
 
@@ -17,7 +20,10 @@ if TYPE_CHECKING:
 class Frame:
     def __init__(self, freq: int, time: int, max_layer: int, nodeb: NodeB):
         # i.e., one_bu = frame.layer[layer(l|MAX_LAYER)].bu[freq(i|HEIGHT)][time(j|WIDTH)]
-        self.layer: Tuple[Layer, ...] = tuple(Layer(i, freq, time, nodeb) for i in range(max_layer))
+        # one_column = frame.column[freq(i|HEIGHT)][time(j|WIDTH)], shared by the BUs of all the layers
+        self.column: Tuple[Tuple[Column, ...], ...] = tuple(
+            tuple(Column() for _ in range(time)) for _ in range(freq))
+        self.layer: Tuple[Layer, ...] = tuple(Layer(i, freq, time, nodeb, self.column) for i in range(max_layer))
         self._max_layer: int = max_layer
         self._cochannel_offset: int = 0
 
@@ -41,6 +47,18 @@ class Frame:
     def cochannel_offset(self, value):
         self._cochannel_offset = value
 
+    def rb_capacity(self, rb_type: Union[Numerology, LTEResourceBlock]) -> int:
+        """The most RBs of rb_type that a space in one of the layers may hold, see Layer.rb_capacity()."""
+        return max(layer.rb_capacity(rb_type) for layer in self.layer)
+
+    def reset(self):
+        """Back to an empty frame, keeping the NOMA and co-channel wiring of the BUs. For reusing the frame."""
+        for row in self.column:
+            for column in row:
+                column.occupied = ()
+        for layer in self.layer:
+            layer.reset()
+
     def to_json(self) -> Dict[str, Any]:
         frame: Dict[str, Any] = {
             'frame_freq': self.frame_freq,
@@ -52,20 +70,51 @@ class Frame:
         return frame
 
 
+class Column:
+    """The RBs using the BUs at the same (i, j) in the layers of a frame, and the co-channel column of another frame."""
+    __slots__ = ('occupied', 'cochannel')
+
+    def __init__(self):
+        self.occupied: Tuple[Tuple[int, ResourceBlock], ...] = ()  # (layer index, RB), in the order of layer index
+        self.cochannel: Optional[Column] = None
+
+    def set_rb(self, layer_index: int, resource_block: Optional[ResourceBlock]):
+        occupied: List[Tuple[int, ResourceBlock]] = [(k, rb) for k, rb in self.occupied if k != layer_index]
+        if resource_block is not None:
+            occupied.append((layer_index, resource_block))
+            occupied.sort(key=lambda k_rb: k_rb[0])
+        self.occupied: Tuple[Tuple[int, ResourceBlock], ...] = tuple(occupied)
+
+
 class Layer(Undo):
-    def __init__(self, layer_index: int, freq: int, time: int, nodeb: NodeB):
+    def __init__(self, layer_index: int, freq: int, time: int, nodeb: NodeB,
+                 column: Tuple[Tuple[Column, ...], ...]):
         # i.e., BU[frequency(i|HEIGHT)][time(j|WIDTH)]
         super().__init__()
         self.layer_index: int = layer_index
         self.FREQ: int = freq
         self.TIME: int = time
         self.nodeb: NodeB = nodeb
+
+        # The occupancy of the layer, written by the BUs. For the scans over a whole layer.
+        self.rb_id: np.ndarray = np.full((freq, time), -1, dtype=np.int64)  # the RB using the BU, -1 for unused
+        self.row_mask: List[int] = [0] * freq  # bit j of row_mask[i] is set if BU(i, j) is used
+        self._next_rb_id: int = 0
+        # the summed-area table of is_used, used_sum[i][j] is the number of used BUs in [0..i-1] x [0..j-1]
+        self._used_sum: np.ndarray = np.zeros((freq + 1, time + 1), dtype=np.int64)
+        self.column: Tuple[Tuple[Column, ...], ...] = column
+        # the free space index of space.empty_space(), the runs of unused BUs in each row and the merged spaces.
+        # None for outdated, set by the BUs on a change.
+        self.empty_runs: List[Optional[List[Tuple[int, int]]]] = [None] * freq
+        self.empty_spaces: Optional[Tuple[Space, ...]] = None
+
         self.bu: Tuple[Tuple[BaseUnit, ...], ...] = tuple(
             tuple(BaseUnit(i, j, self) for j in range(time)) for i in range(freq))
 
         self._available_frequent_offset: int = 0
-        self._cache_is_valid: bool = False  # valid bit (for _available_block)
-        self._bu_status: Tuple[Tuple[bool, ...], ...] = tuple()
+        # updated in place by the BUs, rebuilt from rb_id only if the cache is invalidated from outside
+        self._cache_is_valid: bool = True  # valid bit (for _available_block)
+        self._bu_status: List[List[bool]] = [[False] * time for _ in range(freq)]
 
     @Undo.undo_func_decorator
     def allocate_resource_block(self, offset_i: int, offset_j: int, ue: UserEquipment) -> Optional[ResourceBlock]:
@@ -103,7 +152,7 @@ class Layer(Undo):
                 if i == j == 0:
                     bu.is_upper_left = True
                 bu.set_up(resource_block)
-                self.append_undo(lambda b=bu: b.undo(), lambda b=bu: b.purge_undo())
+                self.append_undo_nested(bu)
         nb_info.rb.append(resource_block)
         self.append_undo(lambda: nb_info.rb.remove(resource_block))
         return resource_block
@@ -153,10 +202,74 @@ class Layer(Undo):
             return self.nodeb.frame.cochannel_offset - self._available_frequent_offset
         return self.FREQ - self._available_frequent_offset
 
+    def new_rb_id(self) -> int:
+        rb_id: int = self._next_rb_id
+        self._next_rb_id += 1
+        return rb_id
+
     @property
-    def bu_status(self) -> Tuple[Tuple[bool, ...], ...]:
+    def is_used(self) -> np.ndarray:
+        """The BUs used by a RB, (FREQ x TIME)."""
+        return self.rb_id >= 0
+
+    @property
+    def used_sum(self) -> np.ndarray:
+        """
+        Read only. The summed-area table of the used BUs, ((FREQ + 1) x (TIME + 1)).
+        Kept up to date by the BUs, a used BU (i, j) adds one to used_sum[i + 1:, j + 1:].
+        """
+        return self._used_sum
+
+    def count_used(self, i_start: int, i_end: int, j_start: int, j_end: int) -> int:
+        """The number of used BUs in [i_start..i_end] x [j_start..j_end], four reads of the summed-area table."""
+        used_sum: np.ndarray = self._used_sum
+        return int(used_sum[i_end + 1, j_end + 1] - used_sum[i_start, j_end + 1]
+                   - used_sum[i_end + 1, j_start] + used_sum[i_start, j_start])
+
+    def is_empty(self, i_start: int, i_end: int, j_start: int, j_end: int) -> bool:
+        """If the BUs [i_start..i_end] x [j_start..j_end] are all unused."""
+        return self.count_used(i_start, i_end, j_start, j_end) == 0
+
+    @property
+    def num_of_used(self) -> int:
+        return int(self._used_sum[-1, -1])
+
+    def rb_capacity(self, rb_type: Union[Numerology, LTEResourceBlock]) -> int:
+        """
+        An upper bound of the RBs of rb_type that fit in the empty spaces of the layer, counted from the unused BUs.
+        The spaces don't overlap, so a UE requesting more RBs than this doesn't fit in any of them.
+        """
+        return (self.FREQ * self.TIME - self.num_of_used) // rb_type.count_bu
+
+    def first_unused(self, i: int, j: int) -> int:
+        """The first unused BU in row i from j on, TIME if there is none."""
+        unused: int = ~self.row_mask[i] >> j
+        return min(j + (unused & -unused).bit_length() - 1, self.TIME)
+
+    def last_used(self) -> Optional[Tuple[int, int]]:
+        """The last used BU in the order of (i, j), None for an empty layer."""
+        for i in range(self.FREQ - 1, -1, -1):
+            if self.row_mask[i]:
+                return i, self.row_mask[i].bit_length() - 1
+        return None
+
+    def unused_runs(self, i: int) -> List[Tuple[int, int]]:
+        """The runs of unused BUs in row i, in (j_start, j_end)."""
+        runs: List[Tuple[int, int]] = []
+        unused: int = ~self.row_mask[i] & ((1 << self.TIME) - 1)
+        while unused:
+            j_start: int = (unused & -unused).bit_length() - 1
+            run: int = unused >> j_start
+            length: int = (~run & (run + 1)).bit_length() - 1  # the trailing ones
+            runs.append((j_start, j_start + length - 1))
+            unused &= ~(((1 << length) - 1) << j_start)
+        return runs
+
+    @property
+    def bu_status(self) -> List[List[bool]]:
+        """Read only. The BUs used by a RB, kept up to date by set_up(), clear_up() and undo."""
         if not self._cache_is_valid:
-            self._bu_status = tuple(tuple(column.is_used for column in row) for row in self.bu)
+            self._bu_status: List[List[bool]] = self.is_used.tolist()
             self._cache_is_valid: bool = True
         return self._bu_status
 
@@ -169,6 +282,22 @@ class Layer(Undo):
         assert value is False, "Only the property bu_status may update the bu status and set _cache_is_valid to True."
         self._cache_is_valid: bool = value
 
+    def reset(self):
+        """Clear the RBs and the undo functions of the layer and its' BUs in bulk, see Frame.reset()."""
+        Undo.__init__(self)
+        self.rb_id.fill(-1)
+        self.row_mask: List[int] = [0] * self.FREQ
+        self._next_rb_id: int = 0
+        self._used_sum.fill(0)
+        self.empty_runs: List[Optional[List[Tuple[int, int]]]] = [None] * self.FREQ
+        self.empty_spaces: Optional[Tuple[Space, ...]] = None
+        self._available_frequent_offset: int = 0
+        self._cache_is_valid: bool = True
+        self._bu_status: List[List[bool]] = [[False] * self.TIME for _ in range(self.FREQ)]
+        for row in self.bu:
+            for bu in row:
+                bu.reset()
+
     def to_json(self) -> Dict[str, Any]:
         layer: Dict[str, Any] = {
             'bu_status': self.bu_status,
@@ -181,6 +310,10 @@ class Layer(Undo):
 
 
 class BaseUnit(Undo):
+    __slots__ = ('_absolute_i', '_absolute_j', '_layer', '_is_cochannel', '_cochannel_nb', '_cochannel_absolute_i',
+                 '_within_rb', 'sinr', '_is_to_recalculate_sinr', '_interference', '_interference_delta',
+                 '_column', '_is_noma', '_overlapped_bu', 'is_upper_left')
+
     def __init__(self, absolute_i: int, absolute_j: int, layer: Layer):
         super().__init__()
         self._absolute_i: int = absolute_i
@@ -194,14 +327,27 @@ class BaseUnit(Undo):
         self._within_rb: Optional[ResourceBlock] = None
         self.sinr: float = float('-inf')
         self._is_to_recalculate_sinr: bool = False
-        self._lapped_cache_is_valid: bool = False
+        # the running (NOMA, INI, cross-tier) interference and the overlapped RBs placed since,
+        # maintained by the SINR engine. None for to be summed from scratch.
+        self._interference: Optional[Tuple[float, float, float]] = None
+        self._interference_delta: Tuple[ResourceBlock, ...] = ()
+        self._column: Column = layer.column[absolute_i][absolute_j]
+        self._is_noma: bool = False
         self._overlapped_bu: Tuple[BaseUnit, ...] = ()
-        self._overlapped_rb: Tuple[ResourceBlock, ...] = ()
-        self._overlapped_ue: Tuple[UserEquipment, ...] = ()
 
         # for MSEMA
         self.is_upper_left: bool = False
 
+    def reset(self):
+        """Clear the runtime state set since __init__(), but not the NOMA and co-channel wiring."""
+        Undo.__init__(self)
+        self._within_rb: Optional[ResourceBlock] = None
+        self.sinr: float = float('-inf')
+        self._is_to_recalculate_sinr: bool = False
+        self._interference: Optional[Tuple[float, float, float]] = None
+        self._interference_delta: Tuple[ResourceBlock, ...] = ()
+        self.is_upper_left: bool = False
+
     def set_noma_bu(self):
         """Execute once."""
         overlapped_bu: List[BaseUnit] = []
@@ -209,50 +355,103 @@ class BaseUnit(Undo):
             if layer is not self.layer:
                 overlapped_bu.append(layer.bu[self.absolute_i][self.absolute_j])
         self._overlapped_bu: Tuple[BaseUnit, ...] = tuple(overlapped_bu)
+        self._is_noma: bool = True
 
     @Undo.undo_func_decorator
     def set_up(self, resource_block: ResourceBlock):
         # relative position of this BU withing a RB
         assert not self.is_used, f'BU({self.absolute_i}, {self.absolute_j}) in {self.layer.nodeb.nb_type} layer {self.layer.layer_index} is used by UE {self.within_rb.ue.uuid.hex[:4]}(uuid)'
-        self.append_undo(lambda rb=self._within_rb: setattr(self, "_within_rb", rb))
-        self._within_rb: ResourceBlock = resource_block
-        self.append_undo(lambda origin=self._is_to_recalculate_sinr: setattr(self, '_is_to_recalculate_sinr', origin))
+        self.append_undo(self._snapshot(is_upper_left=False))
+        self._set_within_rb(resource_block)
         self._is_to_recalculate_sinr: bool = True
+        self._interference = None
+        self._interference_delta = ()
 
-        self._effect_others()
-        self.append_undo(lambda: setattr(self.layer, 'bu_status_cache_is_valid', False))
-        self.layer.bu_status_cache_is_valid = False
-
-        self.append_undo(lambda: setattr(self, 'is_upper_left', False))
+        self._effect_others(resource_block)
 
     @Undo.undo_func_decorator
     def clear_up(self):
         assert self.is_used
-        self.append_undo(lambda rb=self._within_rb: setattr(self, "_within_rb", rb))
-        self._within_rb = None
-        self.append_undo(lambda i=self.sinr: setattr(self, "sinr", i))
+        resource_block: ResourceBlock = self._within_rb
+        self.append_undo(self._snapshot(is_upper_left=self.is_upper_left, sinr=self.sinr))
+        self._set_within_rb(None)
         self.sinr: float = float('-inf')
-        self.append_undo(lambda origin=self._is_to_recalculate_sinr: setattr(self, '_is_to_recalculate_sinr', origin))
         self._is_to_recalculate_sinr: bool = False
+        self._interference = None
+        self._interference_delta = ()
 
-        self._effect_others()
-        self.append_undo(lambda: setattr(self.layer, 'bu_status_cache_is_valid', False))
-        self.layer.bu_status_cache_is_valid = False
+        self._effect_others(None)
 
-        self.append_undo(lambda origin=self.is_upper_left: setattr(self, 'is_upper_left', origin))
         self.is_upper_left: bool = False
 
-    def _effect_others(self):
+    def _snapshot(self, is_upper_left: bool, sinr: Optional[float] = None) -> Callable[[], None]:
+        """
+        One undo function for set_up() and clear_up(), instead of one for each field they change.
+        It restores this BU, and the overlapped BUs and UEs changed by _effect_others().
+        The running interference of this BU and the overlapped BUs is dropped instead of restored,
+        the SINR engine may have added RBs to it since the snapshot, see update_interference().
+        :param sinr: The SINR to restore, None for the SINR is restored by the channel model.
+        """
+        origin: Tuple[Optional[ResourceBlock], bool] = (self._within_rb, self._is_to_recalculate_sinr)
+        origin_ue: Tuple[Tuple[UserEquipment, bool], ...] = tuple(
+            (ue, ue.is_to_recalculate_mcs) for ue in self.overlapped_ue)
+        origin_bu: Tuple[Tuple[BaseUnit, bool], ...] = tuple(
+            (bu, bu._is_to_recalculate_sinr) for bu in self.overlapped_bu)
+
+        def restore():
+            self._set_within_rb(origin[0])
+            self._is_to_recalculate_sinr = origin[1]
+            self._interference = None
+            self._interference_delta = ()
+            self.is_upper_left = is_upper_left
+            if sinr is not None:
+                self.sinr = sinr
+            for ue, is_to_recalculate_mcs in origin_ue:
+                ue.is_to_recalculate_mcs = is_to_recalculate_mcs
+            for bu, is_to_recalculate_sinr in origin_bu:
+                bu._is_to_recalculate_sinr = is_to_recalculate_sinr
+                bu._interference = None
+                bu._interference_delta = ()
+
+        return restore
+
+    def _effect_others(self, resource_block: Optional[ResourceBlock]):
+        """
+        The undo is in the _snapshot() taken before.
+        The running interference of an overlapped BU is kept only if resource_block is placed
+        as its' last overlapped RB. Adding it to the total is then the same float sum
+        as summing the overlapped RBs from scratch, in order.
+        Otherwise, e.g. a RB is removed, the interference is summed from scratch by the SINR engine.
+        :param resource_block: The RB placed on this BU, None if the RB is removed.
+        """
         self.assert_undo_function()
         for ue in self.overlapped_ue:
-            self.append_undo(lambda u=ue, origin=ue.is_to_recalculate_mcs: setattr(u, "is_to_recalculate_mcs", origin))
             ue.is_to_recalculate_mcs = True
         for bu in self.overlapped_bu:
-            self.append_undo(
-                lambda b=bu, origin=bu._is_to_recalculate_sinr: setattr(b, "_is_to_recalculate_sinr", origin))
-            self.append_undo(lambda b=bu: setattr(b, "overlapped_cache_is_valid", False))
             bu._is_to_recalculate_sinr = True
-            bu.overlapped_cache_is_valid = False
+
+            if bu._interference is not None:
+                if (resource_block is not None and len(bu._interference_delta) < len(bu.overlapped_bu)
+                        and bu.overlapped_rb[-1] is resource_block):
+                    bu._interference_delta += (resource_block,)
+                else:
+                    bu._interference = None
+                    bu._interference_delta = ()
+
+    def _set_within_rb(self, resource_block: Optional[ResourceBlock]):
+        if (self._within_rb is None) is not (resource_block is None):
+            used: int = 1 if resource_block is not None else -1
+            self._layer._used_sum[self._absolute_i + 1:, self._absolute_j + 1:] += used
+        self._within_rb: Optional[ResourceBlock] = resource_block
+        self._layer.rb_id[self._absolute_i, self._absolute_j] = -1 if resource_block is None else resource_block.rb_id
+        self._layer._bu_status[self._absolute_i][self._absolute_j] = resource_block is not None
+        self._layer.empty_runs[self._absolute_i] = None
+        if resource_block is None:
+            self._layer.row_mask[self._absolute_i] &= ~(1 << self._absolute_j)
+        else:
+            self._layer.row_mask[self._absolute_i] |= 1 << self._absolute_j
+        self._layer.empty_spaces = None
+        self._column.set_rb(self._layer.layer_index, resource_block)
 
     @property
     def lapped_is_upper_left(self) -> bool:
@@ -274,37 +473,24 @@ class BaseUnit(Undo):
         return self._overlapped_bu
 
     @property
-    def overlapped_rb(self) -> Tuple[ResourceBlock]:
-        if not self.overlapped_cache_is_valid:
-            self._overlapped_element()
-        return self._overlapped_rb
+    def overlapped_rb(self) -> Tuple[ResourceBlock, ...]:
+        """The RBs using the overlapped BUs, in the order of overlapped_bu. Read from the columns, never rebuilt."""
+        column: Column = self._column
+        if self._is_noma:
+            layer_index: int = self._layer.layer_index
+            overlapped_rb: Tuple[ResourceBlock, ...] = tuple(rb for k, rb in column.occupied if k != layer_index)
+        else:
+            overlapped_rb: Tuple[ResourceBlock, ...] = ()
+        if self._is_cochannel:
+            overlapped_rb += tuple(rb for _, rb in column.cochannel.occupied)
+        return overlapped_rb
 
     @property
-    def overlapped_ue(self) -> Tuple[UserEquipment]:
-        if not self.overlapped_cache_is_valid:
-            self._overlapped_element()
-        return self._overlapped_ue
-
-    def _overlapped_element(self):
-        overlapped_rb: List[ResourceBlock] = []
+    def overlapped_ue(self) -> Tuple[UserEquipment, ...]:
         overlapped_ue = set()
-        for bu in self.overlapped_bu:
-            if rb := bu.within_rb:
-                overlapped_rb.append(rb)
-                overlapped_ue.add(rb.ue)
-
-        self._overlapped_rb: Tuple[ResourceBlock, ...] = tuple(overlapped_rb)
-        self._overlapped_ue: Tuple[UserEquipment, ...] = tuple(overlapped_ue)
-        self._lapped_cache_is_valid: bool = True
-
-    @property
-    def overlapped_cache_is_valid(self) -> bool:
-        return self._lapped_cache_is_valid
-
-    @overlapped_cache_is_valid.setter
-    def overlapped_cache_is_valid(self, value: bool):
-        assert not value, "Only _overlapped_element() can change the status to True."
-        self._lapped_cache_is_valid: bool = value
+        for rb in self.overlapped_rb:
+            overlapped_ue.add(rb.ue)
+        return tuple(overlapped_ue)
 
     def set_cochannel(self, nodeb: Union[ENodeB, GNodeB], absolute_i: int):
         self._is_cochannel: bool = True
@@ -315,6 +501,7 @@ class BaseUnit(Undo):
         for layer in self.cochannel_nb.frame.layer:
             overlapped_bu.append(layer.bu[self.cochannel_bu_i][self.absolute_j])
         self._overlapped_bu: Tuple[BaseUnit, ...] = tuple(overlapped_bu)
+        self._column.cochannel = self.cochannel_nb.frame.column[self.cochannel_bu_i][self.absolute_j]
 
     @property
     def is_cochannel(self) -> bool:
@@ -337,6 +524,24 @@ class BaseUnit(Undo):
         assert not value, "Only SINR calculator will change the status of this bool from outside the BaseUnit object."
         self._is_to_recalculate_sinr: bool = value
 
+    @property
+    def interference(self) -> Optional[Tuple[float, float, float]]:
+        return self._interference
+
+    @property
+    def interference_delta(self) -> Tuple[ResourceBlock, ...]:
+        return self._interference_delta
+
+    def update_interference(self, interference: Tuple[float, float, float]):
+        """
+        Only the SINR engine updates the running interference, after adding the interference_delta.
+        Undo isn't needed, the interference is always the sum of the RBs overlapping now.
+        Undoing a set_up() or clear_up() changes the overlapped RBs, and drops the interference, see _snapshot().
+        """
+        assert self.is_used
+        self._interference: Tuple[float, float, float] = interference
+        self._interference_delta: Tuple[ResourceBlock, ...] = ()
+
     @property
     def within_rb(self) -> ResourceBlock:
         return self._within_rb
@@ -15,6 +15,8 @@ class GNodeB(NodeB):
 
 
 class GUserEquipment(UserEquipment):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ue_type: UEType = UEType.G
@@ -26,6 +28,8 @@ class GUserEquipment(UserEquipment):
 
 
 class DUserEquipment(UserEquipment):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ue_type: UEType = UEType.D
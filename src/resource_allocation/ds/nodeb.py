@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union
+from typing import Any, Dict, Optional, TYPE_CHECKING, Union
 
 from .frame import Frame
+from .rb import RBList
 from .util_enum import E_MCS, G_MCS, NodeBType
 
 if TYPE_CHECKING:
@@ -34,7 +35,7 @@ class _NBInfoWithinUE:
     def __init__(self):
         self.nb: Optional[NodeB] = None
         self.mcs: Optional[Union[E_MCS, G_MCS]] = None
-        self.rb: List[ResourceBlock] = list()
+        self.rb: RBList = RBList()
 
     @property
     def nb_type(self) -> NodeBType:
@@ -42,15 +43,11 @@ class _NBInfoWithinUE:
         return self.nb.nb_type
 
     def update_mcs(self):
-        if self.rb:
-            self.mcs = min(self.rb, key=lambda b: b.mcs.value).mcs
-        else:
-            self.mcs = None
+        self.mcs = self.rb.lowest_mcs()
 
     def highest_frequency_rb(self) -> Optional[ResourceBlock]:
         if self.rb:
-            self.rb.sort(key=lambda x: x.j_start)  # sort by time
-            self.rb.sort(key=lambda x: x.i_start)  # sort by freq
+            self.rb.sort_by_position()  # sort by freq and time
             return self.rb[-1]
         else:
             return None
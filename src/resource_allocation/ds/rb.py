@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING, Union
+from typing import Any, Dict, Iterable, Optional, Tuple, TYPE_CHECKING, Union
 
 from .undo import Undo
 from .util_enum import E_MCS, G_MCS, NodeBType, Numerology
@@ -11,12 +11,16 @@ if TYPE_CHECKING:
 
 
 class ResourceBlock(Undo):
+    __slots__ = ('layer', 'rb_id', 'ue', '_numerology', 'position', '_sinr', '_mcs',
+                 '__weakref__')  # weak referenced by the SINR memo
+
     def __repr__(self):
         return f'U{self.ue.uuid.hex[:4]} R{str(id(self))[:4]} M{self.mcs.name[3:5]}'
 
     def __init__(self, layer: Layer, starting_i: int, starting_j: int, ue: UserEquipment):
         super().__init__()
         self.layer: Layer = layer
+        self.rb_id: int = layer.new_rb_id()  # unique in the layer
         self.ue: UserEquipment = ue
         self._numerology = ue.numerology_in_use
         self.position: Tuple[int, int, int, int] = self.update_position(starting_i, starting_j)
@@ -50,7 +54,12 @@ class ResourceBlock(Undo):
             for bu_j in range(self.j_start, self.j_end + 1):
                 bu: BaseUnit = self.layer.bu[bu_i][bu_j]
                 bu.clear_up()
-                self.append_undo(lambda b=bu: b.undo(), lambda b=bu: b.purge_undo())
+                self.append_undo_nested(bu)
+
+    @property
+    def rb_list(self) -> RBList:
+        """The RB list of the UE this RB is (or was) in."""
+        return (self.ue.gnb_info if self.layer.nodeb.nb_type == NodeBType.G else self.ue.enb_info).rb
 
     @property
     def sinr(self) -> float:
@@ -58,9 +67,13 @@ class ResourceBlock(Undo):
 
     @sinr.setter
     def sinr(self, sinr: float):
+        self.set_sinr(sinr, (G_MCS if self.layer.nodeb.nb_type == NodeBType.G else E_MCS).sinr_to_mcs(sinr))
+
+    def set_sinr(self, sinr: float, mcs: Union[E_MCS, G_MCS]):
+        """Set the SINR with its' MCS looked up in advance, e.g. by sinr_to_mcs_array() for a batch of RBs."""
         self._sinr: float = sinr
-        self._mcs: Union[E_MCS, G_MCS] = (G_MCS if self.layer.nodeb.nb_type == NodeBType.G else E_MCS).sinr_to_mcs(
-            self.sinr)
+        self._mcs: Union[E_MCS, G_MCS] = mcs
+        self.rb_list.recount(self)
 
     @property
     def mcs(self) -> Union[E_MCS, G_MCS]:
@@ -95,3 +108,123 @@ class ResourceBlock(Undo):
             'mcs': self.mcs.index if self.mcs else None
         }
         return rb
+
+
+class RBList(list):
+    """
+    The RBs of a UE in a BS. A plain list in the order the algorithms sort it,
+    that also counts the RBs of each MCS and knows if it's sorted by (i, j),
+    so the lowest MCS, the throughput and the highest frequency RB are found without going through the RBs.
+    The counts follow the RBs appended and removed, and the RBs calculating a new MCS, including the undo of them.
+    """
+    _counted: Optional[Dict[ResourceBlock, Optional[Union[E_MCS, G_MCS]]]] = None  # RB: the MCS counted, None to count
+    _is_by_position: bool = False
+
+    def __init__(self, rb_list: Iterable[ResourceBlock] = ()):
+        super().__init__(rb_list)
+        self._mcs_count: Dict[Optional[Union[E_MCS, G_MCS]], int] = {}
+        self._counted: Optional[Dict[ResourceBlock, Optional[Union[E_MCS, G_MCS]]]] = None
+        self._is_by_position: bool = not self
+
+    def append(self, rb: ResourceBlock):
+        if self._is_by_position and self and (rb.i_start, rb.j_start) < (self[-1].i_start, self[-1].j_start):
+            self._is_by_position: bool = False
+        super().append(rb)
+        if self._counted is not None:
+            self._count(rb)
+
+    def remove(self, rb: ResourceBlock):
+        super().remove(rb)
+        if self._counted is not None:
+            self._uncount(rb)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._is_by_position: bool = False
+
+    def _invalidate(self):
+        self._counted = None
+        self._is_by_position: bool = False
+
+    def extend(self, rb_list: Iterable[ResourceBlock]):
+        super().extend(rb_list)
+        self._invalidate()
+
+    def insert(self, index: int, rb: ResourceBlock):
+        super().insert(index, rb)
+        self._invalidate()
+
+    def pop(self, index: int = -1) -> ResourceBlock:
+        rb: ResourceBlock = super().pop(index)
+        self._invalidate()
+        return rb
+
+    def clear(self):
+        super().clear()
+        self._invalidate()
+
+    def reverse(self):
+        super().reverse()
+        self._invalidate()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._invalidate()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._invalidate()
+
+    def __iadd__(self, rb_list: Iterable[ResourceBlock]) -> RBList:
+        self.extend(rb_list)
+        return self
+
+    def sort_by_position(self):
+        """The same as sorting by time and then by frequency, skipped if it's sorted already."""
+        if not self._is_by_position:
+            super().sort(key=lambda rb: (rb.i_start, rb.j_start))
+            self._is_by_position: bool = True
+
+    def lowest_mcs(self) -> Optional[Union[E_MCS, G_MCS]]:
+        """The same as min(self, key=lambda rb: rb.mcs.value).mcs, None for an empty list."""
+        if self._counted is None:
+            self._counted: Dict[ResourceBlock, Optional[Union[E_MCS, G_MCS]]] = {}
+            self._mcs_count.clear()
+            for rb in self:
+                self._count(rb)
+        if not self._mcs_count:
+            return None
+        return min(self._mcs_count, key=lambda mcs: mcs.value)
+
+    def throughput(self) -> float:
+        """The same as lowest_mcs().value * len(self), 0.0 for an empty list."""
+        return self.lowest_mcs().value * len(self) if self else 0.0
+
+    def throughput_without_last(self) -> float:
+        """The throughput if the last RB were removed, the same as RBList(self[:-1]).throughput() without the copy."""
+        if len(self) <= 1:
+            return 0.0
+        lowest_mcs: Union[E_MCS, G_MCS] = self.lowest_mcs()
+        mcs_last: Union[E_MCS, G_MCS] = self._counted[self[-1]]
+        if mcs_last is lowest_mcs and self._mcs_count[mcs_last] == 1:  # the only RB of the lowest MCS
+            lowest_mcs: Union[E_MCS, G_MCS] = min((mcs for mcs in self._mcs_count if mcs is not mcs_last),
+                                                  key=lambda mcs: mcs.value)
+        return lowest_mcs.value * (len(self) - 1)
+
+    def recount(self, rb: ResourceBlock):
+        """Called by the RB whose MCS has changed."""
+        if self._counted is not None and rb in self._counted:
+            self._uncount(rb)
+            self._count(rb)
+
+    def _count(self, rb: ResourceBlock):
+        assert rb not in self._counted, 'The RB is in the list already.'
+        mcs: Optional[Union[E_MCS, G_MCS]] = rb._mcs
+        self._counted[rb] = mcs
+        self._mcs_count[mcs] = self._mcs_count.get(mcs, 0) + 1
+
+    def _uncount(self, rb: ResourceBlock):
+        mcs: Optional[Union[E_MCS, G_MCS]] = self._counted.pop(rb)
+        self._mcs_count[mcs] -= 1
+        if not self._mcs_count[mcs]:
+            del self._mcs_count[mcs]
@@ -78,61 +78,54 @@ class Space:
         return self.ending_i - self.starting_i + 1
 
     def assert_is_empty(self):
-        for i in range(self.starting_i, self.ending_i + 1):
-            for j in range(self.starting_j, self.ending_j + 1):
-                assert not self.layer.bu[i][j].is_used, "The space is not empty."
+        assert self.layer.is_empty(self.starting_i, self.ending_i, self.starting_j, self.ending_j), \
+            "The space is not empty."
 
 
 def empty_space(layer: Layer) -> Tuple[Space, ...]:
+    """The empty spaces in the layer, kept in layer.empty_spaces until a BU of the layer changes."""
     # ref: https://hackmd.io/HaKC3jR5Q4KOcumGo8RvKQ?view
-    spaces: List[Dict] = scan(layer)
-    spaces: List[Dict] = merge(spaces)
+    if layer.empty_spaces is None:
+        spaces: List[Dict] = scan(layer)
+        spaces: List[Dict] = merge(spaces)
 
-    empty_spaces: List[Space] = []
-    for space in spaces:
-        s: Space = Space(layer, space['i_start'], space['j_start'], space['i_end'], space['j_end'])
-        if not s.rb_type:   # if the space is too narrow to contain even one RB
-            continue
-        empty_spaces.append(s)
-    return tuple(empty_spaces)
+        empty_spaces: List[Space] = []
+        for space in spaces:
+            s: Space = Space(layer, space['i_start'], space['j_start'], space['i_end'], space['j_end'])
+            if not s.rb_type:   # if the space is too narrow to contain even one RB
+                continue
+            empty_spaces.append(s)
+        layer.empty_spaces: Tuple[Space, ...] = tuple(empty_spaces)
+    return layer.empty_spaces
 
 
 def scan(layer: Layer) -> List[Dict]:
-    bu_status = layer.bu_status
-    spaces: List[Dict] = []
-    for i in range(layer.FREQ):
-        tmp_space: Dict = {'i_start': i, 'j_start': -1, 'i_end': i, 'j_end': -1}
-        for j in range(layer.TIME):
-            if not bu_status[i][j]:  # is empty
-                tmp_space['j_end'] = j
-                if tmp_space['j_start'] == -1:
-                    tmp_space['j_start'] = j
-                if j == layer.TIME - 1:
-                    spaces.append(tmp_space)
-            elif tmp_space['j_start'] != -1:  # meet an allocated RB
-                spaces.append(tmp_space)
-                tmp_space: Dict = {'i_start': i, 'j_start': -1, 'i_end': i, 'j_end': -1}
-    return spaces
+    """
+    The runs of unused BUs in each row, in the order of (i, j).
+    Only the rows changed since the last scan are scanned again, the others are read from layer.empty_runs.
+    """
+    for i, runs in enumerate(layer.empty_runs):
+        if runs is None:
+            layer.empty_runs[i] = layer.unused_runs(i)
+    return [{'i_start': i, 'j_start': j_start, 'i_end': i, 'j_end': j_end}
+            for i, runs in enumerate(layer.empty_runs) for j_start, j_end in runs]
 
 
 def merge(spaces: List[Dict]) -> List[Dict]:
+    """
+    Merge the runs of the same columns in continuous rows into rectangles, in one pass.
+    :param spaces: The runs of unused BUs, in the order of (i, j).
+    :return: The merged spaces, in the order of their first row.
+    """
     merged_spaces: List[Dict] = []
-    while spaces:
-        space: Dict = spaces.pop(0)  # space to be merged
-        i: int = 0
-        while i < len(spaces):
-            another_space: Dict = spaces[i]
-            if (another_space['i_start'] == space['i_end'] + 1) and (another_space['j_start'] == space['j_start']) and (
-                    another_space['j_end'] == space['j_end']):  # merge continuous and same width space
-                space['i_end'] = another_space['i_end']  # merge
-                spaces.remove(another_space)  # remove the merged space
-            elif another_space['i_start'] > space['i_end'] + 1:
-                # not possible to merge into a rectangle
-                break
-            else:
-                i += 1
-        merged_spaces.append(space)
-
+    lowest: Dict[Tuple[int, int], Dict] = {}  # (j_start, j_end): the merged space ends in the lowest row
+    for space in spaces:
+        columns: Tuple[int, int] = (space['j_start'], space['j_end'])
+        if (merged := lowest.get(columns)) and merged['i_end'] + 1 == space['i_start']:
+            merged['i_end'] = space['i_end']  # merge continuous and same width space
+        else:
+            merged_spaces.append(space)
+            lowest[columns] = space
     return merged_spaces
 
 
@@ -155,9 +148,8 @@ def next_rb_in_space(bu_starting_i: int, bu_starting_j: int, rb_type: Union[Nume
             return None  # running out of space
 
     # check if the space is empty
-    for i in range(bu_starting_i, bu_starting_i + rb_type.freq):
-        for j in range(bu_starting_j, bu_starting_j + rb_type.time):
-            if layer.bu_status[i][j]:
-                return None  # the space is occupied
+    if not layer.is_empty(bu_starting_i, bu_starting_i + rb_type.freq - 1,
+                          bu_starting_j, bu_starting_j + rb_type.time - 1):
+        return None  # the space is occupied
 
     return bu_starting_i, bu_starting_j
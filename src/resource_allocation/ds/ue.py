@@ -16,6 +16,10 @@ if TYPE_CHECKING:
 
 
 class UserEquipment:
+    __slots__ = ('uuid', 'request_data_rate', 'candidate_set', 'coordinate', 'ue_type', 'enb_info', 'gnb_info',
+                 'numerology_in_use', '_is_to_recalculate_mcs', '_throughput', 'connection_preference',
+                 'nb_preference')
+
     def __init__(self, request_data_rate: int, candidate_set: CandidateSet, coordinate: Coordinate):
         self.uuid: UUID = uuid4()
         self.request_data_rate: int = request_data_rate  # quantifier: bit per frame
@@ -99,10 +103,10 @@ class UserEquipment:
     def calc_throughput(self) -> float:
         """ Won't change any value in UserEquipment. """
         tmp_throughput: float = 0.0
-        if hasattr(self, 'gnb_info') and self.gnb_info.rb:
-            tmp_throughput += min(self.gnb_info.rb, key=lambda rb: rb.mcs.value).mcs.value * len(self.gnb_info.rb)
-        if hasattr(self, 'enb_info') and self.enb_info.rb:
-            tmp_throughput += min(self.enb_info.rb, key=lambda rb: rb.mcs.value).mcs.value * len(self.enb_info.rb)
+        if hasattr(self, 'gnb_info'):
+            tmp_throughput += self.gnb_info.rb.throughput()
+        if hasattr(self, 'enb_info'):
+            tmp_throughput += self.enb_info.rb.throughput()
         return tmp_throughput
 
     @property
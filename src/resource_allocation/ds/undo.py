@@ -1,35 +1,46 @@
 # reference:
 # https://github.com/LouisSung/UndoFunc/commit/a0235bddd236475ea4ea96df106a6599ffc35b00
 # https://github.com/LouisSung/UndoFunc/blob/main/undo.py
-from typing import Any, Callable, Dict, List, Tuple
+from __future__ import annotations
+
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+_EMPTY_STACK: Tuple = ()  # shared by the objects without any undo function, replaced by a list on the first one
+
+# The kinds of the undo records, the first item of a record tuple.
+# Each record is a small tuple instead of the closures wrapping every undo function.
+_CALL: int = 0  # (_CALL, undo function, purge function or None)
+_ATTR: int = 1  # (_ATTR, object, attribute name, the original value), nothing to purge
+_NESTED: int = 2  # (_NESTED, an Undo object), undo or purge the last function undo of the object
 
 
 class Undo:
+    __slots__ = ('_func_stack', '_end_of_func')
+
     def __init__(self):
-        self._func_stack: List[List[Tuple[Callable, Callable]]] = []
+        self._func_stack: Union[List[List[Tuple]], Tuple] = _EMPTY_STACK
         self._end_of_func: bool = True
 
-    def append_undo(self, local_func_stack: Callable, purge_callback: Callable = lambda: None):
-        def _execute(undo_or_purge: int):
-            if hasattr(_execute, 'has_called'):  # should never call an undo twice
-                raise ValueError('NEVER invoke the returned `undo()` twice')
-            else:
-                _execute.__setattr__('has_called', True)
-                if undo_or_purge == 0:  # undo
-                    local_func_stack()
-                elif undo_or_purge == 1:  # purge
-                    purge_callback()
-                else:
-                    raise ValueError
-                _execute.__delattr__('undo_lambdas')
+    def append_undo(self, local_func_stack: Callable, purge_callback: Optional[Callable] = None):
+        assert self._func_stack or self._end_of_func is False, "Didn't start a function undo."
+        self._func_stack[-1].append((_CALL, local_func_stack, purge_callback))
 
+    def append_undo_attr(self, obj: Any, name: str, origin: Any):
+        """Restore obj.name to origin on undo, the same as append_undo(lambda: setattr(obj, name, origin))."""
         assert self._func_stack or self._end_of_func is False, "Didn't start a function undo."
-        _execute.undo_lambdas = (lambda: _execute(0), lambda: _execute(1))
-        self._func_stack[-1].append(_execute.undo_lambdas)
+        self._func_stack[-1].append((_ATTR, obj, name, origin))
+
+    def append_undo_nested(self, undo_obj: Undo):
+        """Undo or purge undo_obj along with this one, the same as append_undo(undo_obj.undo, undo_obj.purge_undo)."""
+        assert self._func_stack or self._end_of_func is False, "Didn't start a function undo."
+        self._func_stack[-1].append((_NESTED, undo_obj))
 
     def start_func_undo(self):
         assert self._end_of_func, "The last function undo isn't closed."
         self._end_of_func: bool = False
+        if self._func_stack is _EMPTY_STACK:
+            self._func_stack: List[List[Tuple]] = []
         self._func_stack.append([])
 
     def end_func_undo(self):
@@ -60,23 +71,41 @@ class Undo:
         if num_of_func == 0:
             return False  # nothing to undo
         else:
-            # undo funcs in reverse order
-            # don't do `pop()` here, it's done in the end of the inner `undo_a_func()`
+            # undo the last function first, _undo_function() runs its' records in reverse order
             for _ in range(num_of_func):
                 self._undo_function(self._func_stack.pop(), undo_or_purge)
+            if not self._func_stack:
+                self._func_stack: Tuple = _EMPTY_STACK
             return True
 
     @staticmethod
-    def _undo_function(func_stack: List[Tuple[Callable, Callable]], undo_or_purge: int):
+    def _undo_function(func_stack: List[Tuple], undo_or_purge: int):
         while func_stack:
-            (func_stack.pop()[undo_or_purge])()
+            record: Tuple = func_stack.pop()
+            if record[0] == _ATTR:
+                if undo_or_purge == 0:
+                    setattr(record[1], record[2], record[3])
+            elif record[0] == _NESTED:
+                record[1].undo() if undo_or_purge == 0 else record[1].purge_undo()
+            elif undo_or_purge == 0:
+                record[1]()
+            elif record[2] is not None:
+                record[2]()
 
-    def __getstate__(self):
-        return self.empty_undo_stake(self.__dict__)
+    def __getstate__(self) -> Tuple[Optional[Dict], Dict]:
+        """The (__dict__, slots) state for pickle, without the undo functions."""
+        slots: Dict = {name: getattr(self, name) for name in _slot_names(type(self)) if hasattr(self, name)}
+        return getattr(self, '__dict__', None), self.empty_undo_stake(slots)
 
     @staticmethod
     def empty_undo_stake(d):
         d_copy: Dict = d.copy()
         if d_copy['_func_stack']:
-            d_copy['_func_stack'] = []
+            d_copy['_func_stack'] = _EMPTY_STACK
         return d_copy
+
+
+@functools.lru_cache(maxsize=None)
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    return tuple(name for c in cls.__mro__ for name in getattr(c, '__slots__', ())
+                 if name not in ('__dict__', '__weakref__'))
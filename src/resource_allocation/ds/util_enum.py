@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import bisect
+import functools
 import math
 import random
 from enum import Enum
-from typing import List, TYPE_CHECKING, Union
-from xmlrpc.client import Boolean
+from typing import List, Sequence, Tuple, TYPE_CHECKING, Union
+
+import numpy as np
 
 if TYPE_CHECKING:
     from .util_type import CandidateSet
@@ -92,6 +95,37 @@ class _MCS(Enum):
     def get_worst() -> _MCS:
         raise NotImplementedError
 
+    @staticmethod
+    def get_best() -> _MCS:
+        raise NotImplementedError
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def members_by_index(cls) -> Tuple[_MCS, ...]:
+        """CQI0 to CQI15."""
+        members: Tuple[_MCS, ...] = tuple(sorted(cls, key=lambda mcs: mcs.index))
+        assert [mcs.index for mcs in members] == list(range(len(members)))
+        return members
+
+    @classmethod
+    def sinr_to_mcs(cls, sinr: float) -> _MCS:
+        """
+        The SINR(dB) is looked up in the threshold table of _SINRtoMCS,
+        then clamped to get_best(), and the SINR lower than get_worst() is CQI0.
+        """
+        index: int = bisect.bisect_right(_SINR_THRESHOLD, sinr)
+        if index < cls.get_worst().index:
+            return cls.members_by_index()[0]
+        return cls.members_by_index()[min(index, cls.get_best().index)]
+
+    @classmethod
+    def sinr_to_mcs_array(cls, sinr: Union[Sequence[float], np.ndarray]) -> Tuple[_MCS, ...]:
+        """The same as sinr_to_mcs(), for the SINR of a whole layer or UE at once."""
+        index: np.ndarray = np.searchsorted(_SINR_THRESHOLD_ARRAY, np.asarray(sinr, dtype=np.float64), side='right')
+        index: np.ndarray = np.where(index < cls.get_worst().index, 0, np.minimum(index, cls.get_best().index))
+        members: Tuple[_MCS, ...] = cls.members_by_index()
+        return tuple(members[i] for i in index.tolist())
+
     @property
     def efficiency(self) -> float:
         """
@@ -126,39 +160,12 @@ class _SINRtoMCS:
     CQI15 = 19.809
 
     @staticmethod
-    def sinr_to_mcs(sinr: float, nb_type: NodeBType) -> Union[E_MCS, G_MCS, Boolean]:
-        if sinr < _SINRtoMCS.CQI1:  # SINR out of range
-            return G_MCS.CQI0 if nb_type == NodeBType.G else E_MCS.CQI0
-        elif _SINRtoMCS.CQI1 <= sinr < _SINRtoMCS.CQI2:
-            return G_MCS.CQI1 if nb_type == NodeBType.G else E_MCS.CQI1
-        elif _SINRtoMCS.CQI2 <= sinr < _SINRtoMCS.CQI3:
-            return G_MCS.CQI2 if nb_type == NodeBType.G else E_MCS.CQI2
-        elif _SINRtoMCS.CQI3 <= sinr < _SINRtoMCS.CQI4:
-            return G_MCS.CQI3 if nb_type == NodeBType.G else E_MCS.CQI3
-        elif _SINRtoMCS.CQI4 <= sinr < _SINRtoMCS.CQI5:
-            return G_MCS.CQI4 if nb_type == NodeBType.G else E_MCS.CQI4
-        elif _SINRtoMCS.CQI5 <= sinr < _SINRtoMCS.CQI6:
-            return G_MCS.CQI5 if nb_type == NodeBType.G else E_MCS.CQI5
-        elif _SINRtoMCS.CQI6 <= sinr < _SINRtoMCS.CQI7:
-            return G_MCS.CQI6 if nb_type == NodeBType.G else E_MCS.CQI6
-        elif _SINRtoMCS.CQI7 <= sinr < _SINRtoMCS.CQI8:
-            return G_MCS.CQI7 if nb_type == NodeBType.G else E_MCS.CQI7
-        elif _SINRtoMCS.CQI8 <= sinr < _SINRtoMCS.CQI9:
-            return G_MCS.CQI8 if nb_type == NodeBType.G else E_MCS.CQI8
-        elif _SINRtoMCS.CQI9 <= sinr < _SINRtoMCS.CQI10:
-            return G_MCS.CQI9 if nb_type == NodeBType.G else E_MCS.CQI9
-        elif _SINRtoMCS.CQI10 <= sinr < _SINRtoMCS.CQI11:
-            return G_MCS.CQI10 if nb_type == NodeBType.G else E_MCS.CQI10
-        elif _SINRtoMCS.CQI11 <= sinr < _SINRtoMCS.CQI12:
-            return G_MCS.CQI11 if nb_type == NodeBType.G else E_MCS.CQI11
-        elif _SINRtoMCS.CQI12 <= sinr < _SINRtoMCS.CQI13:
-            return G_MCS.CQI12 if nb_type == NodeBType.G else E_MCS.CQI12
-        elif _SINRtoMCS.CQI13 <= sinr < _SINRtoMCS.CQI14:
-            return G_MCS.CQI13 if nb_type == NodeBType.G else E_MCS.CQI13
-        elif _SINRtoMCS.CQI14 <= sinr < _SINRtoMCS.CQI15:
-            return G_MCS.CQI14 if nb_type == NodeBType.G else E_MCS.CQI14
-        elif _SINRtoMCS.CQI15 <= sinr:
-            return G_MCS.CQI15 if nb_type == NodeBType.G else E_MCS.CQI15
+    def sinr_to_mcs(sinr: float, nb_type: NodeBType) -> Union[E_MCS, G_MCS]:
+        return nb_type.to_mcs.members_by_index()[bisect.bisect_right(_SINR_THRESHOLD, sinr)]
+
+
+_SINR_THRESHOLD: Tuple[float, ...] = tuple(getattr(_SINRtoMCS, f'CQI{i}') for i in range(1, 16))  # CQI1 to CQI15
+_SINR_THRESHOLD_ARRAY: np.ndarray = np.array(_SINR_THRESHOLD)
 
 
 # noinspection PyPep8Naming
@@ -190,17 +197,6 @@ class E_MCS(_MCS):
     def efficiency(self) -> float:
         return self.value / 4
 
-    @staticmethod
-    def sinr_to_mcs(sinr: float) -> E_MCS:
-        worst_mcs: E_MCS = E_MCS.get_worst()
-        best_mcs: E_MCS = E_MCS.get_best()
-        if sinr < getattr(_SINRtoMCS, worst_mcs.name):
-            return E_MCS.CQI0
-        elif sinr > getattr(_SINRtoMCS, best_mcs.name):
-            return best_mcs
-        else:
-            return _SINRtoMCS.sinr_to_mcs(sinr, NodeBType.E)
-
     @staticmethod
     def get_worst() -> E_MCS:
         return E_MCS.CQI1  # <-- change
@@ -241,17 +237,6 @@ class G_MCS(_MCS):
     def efficiency(self) -> float:
         return self.value / 8
 
-    @staticmethod
-    def sinr_to_mcs(sinr: float) -> G_MCS:
-        worst_mcs: G_MCS = G_MCS.get_worst()
-        best_mcs: G_MCS = G_MCS.get_best()
-        if sinr < getattr(_SINRtoMCS, worst_mcs.name):
-            return G_MCS.CQI0
-        elif sinr > getattr(_SINRtoMCS, best_mcs.name):
-            return best_mcs
-        else:
-            return _SINRtoMCS.sinr_to_mcs(sinr, NodeBType.G)
-
     @staticmethod
     def get_worst() -> G_MCS:
         return G_MCS.CQI1  # <-- change
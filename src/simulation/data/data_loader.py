@@ -1,12 +1,13 @@
 import json
-from typing import Dict, List, Tuple, Union
+import threading
+from typing import Dict, List, Optional, Tuple, Union
 
 from src.channel_model.sinr import ChannelModel
 from src.resource_allocation.ds.cochannel import cochannel
 from src.resource_allocation.ds.eutran import ENodeB, EUserEquipment
 from src.resource_allocation.ds.ngran import DUserEquipment, GNodeB, GUserEquipment
 from src.resource_allocation.ds.noma import setup_noma
-from src.resource_allocation.ds.util_enum import LTEResourceBlock, Numerology, UEType
+from src.resource_allocation.ds.util_enum import LTEResourceBlock, NodeBType, Numerology, UEType
 from src.resource_allocation.ds.util_type import CandidateSet, CircularRegion, Coordinate
 
 
@@ -23,10 +24,14 @@ class DataLoader:
         assert '.json' in data_set_file_path, 'Input file path error.'
         with open(data_set_file_path, 'r') as file:
             data_parameters = json.load(file)
-        e_nb, g_nb = self.new_object_nb(data_parameters['e_nb'], data_parameters['g_nb'])
-        channel_model = self.new_object_channel_model(data_parameters['cochannel_bandwidth'], e_nb, g_nb)
+        e_nb, g_nb, cochannel_index = nb_pool.acquire(data_parameters['e_nb'], data_parameters['g_nb'],
+                                                      data_parameters['cochannel_bandwidth'])
+        path_loss: Dict[NodeBType, str] = {NodeBType.E: data_parameters['e_nb'].get('path_loss', 'UMa'),
+                                           NodeBType.G: data_parameters['g_nb'].get('path_loss', 'UMa')}
+        channel_model = self.new_object_channel_model(cochannel_index, data_parameters.get('shadowing_seed'), path_loss)
         g_ue_list, d_ue_list, e_ue_list = self.new_object_ue(data_parameters['g_ue_list'], data_parameters['d_ue_list'],
                                                              data_parameters['e_ue_list'], e_nb, g_nb)
+        channel_model.build_power_rx_table((e_nb, g_nb), e_ue_list + g_ue_list + d_ue_list)
         worsen_threshold = self.convert_worsen_threshold(data_parameters['worsen_threshold'], e_nb.frame.frame_time)
         return g_nb, e_nb, channel_model, g_ue_list, d_ue_list, e_ue_list, data_parameters[
             'gue_qos_range'], data_parameters['eue_qos_range'], data_parameters['inr_discount'], worsen_threshold
@@ -91,11 +96,64 @@ class DataLoader:
         return tuple(ue_list)
 
     @staticmethod
-    def new_object_channel_model(cochannel_bandwidth: int, e_nb: ENodeB, g_nb: GNodeB) -> ChannelModel:
-        cochannel_index: Dict = cochannel(e_nb, g_nb, cochannel_bandwidth=cochannel_bandwidth)
-        return ChannelModel(cochannel_index)
+    def new_object_channel_model(cochannel_index: Dict, shadowing_seed: Optional[int] = None,
+                                 path_loss: Optional[Dict[NodeBType, str]] = None) -> ChannelModel:
+        return ChannelModel(cochannel_index, shadowing_seed=shadowing_seed, path_loss=path_loss)
 
     @staticmethod
     def convert_worsen_threshold(worsen_threshold: int, frame_time: int) -> float:
         sec_to_frame: int = 1000 // (frame_time // 8)
         return worsen_threshold / sec_to_frame  # bit per frame
+
+
+class NodeBPool:
+    """
+    The BSs of finished runs, reset to empty frames and reused by the next data set of the same frame geometry,
+    i.e. the frame size of both BSs, the layers of gNB and the co-channel bandwidth.
+    It saves setting up NOMA and co-channel on every BU again, which takes the most time of building a BS.
+    Thread safe, a pair of BSs is used by one run at a time.
+    """
+
+    def __init__(self):
+        self._pool: Dict[Tuple[int, ...], List[Tuple[ENodeB, GNodeB]]] = {}
+        self._cochannel_index: Dict[Tuple[int, ...], Dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self, para_enb: Dict, para_gnb: Dict, cochannel_bandwidth: int) -> Tuple[ENodeB, GNodeB, Dict]:
+        """
+        A pair of BSs with empty frames, reused from the pool if there is one of the same geometry.
+        :return: e_nb, g_nb, cochannel_index
+        """
+        geometry: Tuple[int, ...] = (para_enb['freq'], para_enb['time'], 1,  # one layer in eNB
+                                     para_gnb['freq'], para_gnb['time'], para_gnb['layer'], cochannel_bandwidth)
+        with self._lock:
+            pooled: List[Tuple[ENodeB, GNodeB]] = self._pool.get(geometry, [])
+            nbs: Optional[Tuple[ENodeB, GNodeB]] = pooled.pop() if pooled else None
+        if nbs is None:
+            e_nb, g_nb = DataLoader.new_object_nb(para_enb, para_gnb)
+            cochannel_index: Dict = cochannel(e_nb, g_nb, cochannel_bandwidth=cochannel_bandwidth)
+            with self._lock:
+                self._cochannel_index[geometry] = cochannel_index
+        else:
+            e_nb, g_nb = nbs
+            for nb, para_nb in ((e_nb, para_enb), (g_nb, para_gnb)):
+                nb.region = CircularRegion(x=para_nb['coordinate'][0], y=para_nb['coordinate'][1],
+                                           radius=para_nb['radius'])
+                nb.power_tx = para_nb['tx_power']
+        return e_nb, g_nb, dict(self._cochannel_index[geometry])
+
+    def release(self, e_nb: ENodeB, g_nb: GNodeB):
+        """
+        Give back the BSs from acquire() after a run.
+        The objects of the run, e.g. the UEs, RBs and channel model, mustn't be used afterward.
+        """
+        e_nb.frame.reset()
+        g_nb.frame.reset()
+        geometry: Tuple[int, ...] = (e_nb.frame.frame_freq, e_nb.frame.frame_time, e_nb.frame.max_layer,
+                                     g_nb.frame.frame_freq, g_nb.frame.frame_time, g_nb.frame.max_layer,
+                                     g_nb.frame.cochannel_offset)
+        with self._lock:
+            self._pool.setdefault(geometry, []).append((e_nb, g_nb))
+
+
+nb_pool: NodeBPool = NodeBPool()
@@ -10,6 +10,7 @@ from main_frsa import frsa
 from main_intuitive import intuitive_resource_allocation
 from main_msema import msema_rb_ra
 from src.resource_allocation.ds.util_enum import E_MCS, G_MCS
+from src.simulation.data.data_loader import nb_pool
 
 
 class IterateAlgo:
@@ -95,6 +96,7 @@ class IterateAlgo:
 
         with open(f'{self.folder_graph}/{filename}', 'w') as f:
             json.dump({f'{topic}{self.topic["folder description"]}': {algo_name: json_result}}, f)
+        nb_pool.release(result[1], result[0])  # for the next data set, the result isn't used anymore
 
     def new_directory(self):
         self.folder_graph: str = f'{os.path.dirname(__file__)}/graph/{self.folder_data}'
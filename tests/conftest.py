@@ -0,0 +1,92 @@
+import random
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pytest
+
+from src.channel_model.sinr import ChannelModel
+from src.resource_allocation.ds.cochannel import cochannel
+from src.resource_allocation.ds.eutran import ENodeB, EUserEquipment
+from src.resource_allocation.ds.frame import Layer
+from src.resource_allocation.ds.ngran import DUserEquipment, GNodeB, GUserEquipment
+from src.resource_allocation.ds.noma import setup_noma
+from src.resource_allocation.ds.rb import ResourceBlock
+from src.resource_allocation.ds.util_enum import LTEResourceBlock, Numerology
+from src.resource_allocation.ds.util_type import CircularRegion, Coordinate
+
+
+@pytest.fixture
+def nbs_with_cochannel_index() -> Tuple[ENodeB, GNodeB, Dict]:
+    """An eNB and a gNB with three NOMA layers, the first 10 rows of the gNB are co-channel with the eNB."""
+    enb = ENodeB(CircularRegion(0.0, 0.0, 0.5), frame_freq=50, frame_time=8)
+    gnb = GNodeB(CircularRegion(0.5, 0.0, 0.5), frame_freq=40, frame_time=8, frame_max_layer=3)
+    setup_noma([gnb])
+    return enb, gnb, cochannel(enb, gnb, cochannel_bandwidth=10)
+
+
+@pytest.fixture
+def nbs(nbs_with_cochannel_index) -> Tuple[ENodeB, GNodeB]:
+    enb, gnb, _ = nbs_with_cochannel_index
+    return enb, gnb
+
+
+@pytest.fixture
+def cochannel_index(nbs_with_cochannel_index) -> Dict:
+    return nbs_with_cochannel_index[2]
+
+
+@pytest.fixture
+def channel_model(cochannel_index) -> ChannelModel:
+    random.seed(7)
+    return ChannelModel(cochannel_index)
+
+
+@pytest.fixture
+def new_ue(nbs) -> Callable[..., GUserEquipment]:
+    """Create a gUE registered to nbs, using the numerology."""
+
+    def new_ue(numerology: Numerology = Numerology.N1, coordinate: Coordinate = Coordinate(0.6, 0.1)) -> GUserEquipment:
+        ue = GUserEquipment(300, (numerology,), coordinate)
+        ue.register_nb(*nbs)
+        ue.numerology_in_use = numerology
+        return ue
+
+    return new_ue
+
+
+@pytest.fixture
+def place_random_rb(new_ue) -> Callable[[Sequence[Layer]], Optional[ResourceBlock]]:
+    """Place a RB of a new gUE with a random numerology at a random position of a random layer, if it's empty."""
+
+    def place_random_rb(layer_list: Sequence[Layer]) -> Optional[ResourceBlock]:
+        layer = random.choice(layer_list)
+        numerology = random.choice(list(Numerology))
+        i = random.randrange(layer.FREQ - numerology.freq + 1)
+        j = random.randrange(layer.TIME - numerology.time + 1)
+        if layer.is_empty(i, i + numerology.freq - 1, j, j + numerology.time - 1):
+            return layer.allocate_resource_block(i, j, new_ue(numerology))
+        return None
+
+    return place_random_rb
+
+
+@pytest.fixture
+def ue_list(nbs):
+    enb, gnb = nbs
+    gue_near = GUserEquipment(300, (Numerology.N1,), Coordinate(0.45, 0.02))
+    gue_far = GUserEquipment(300, (Numerology.N2,), Coordinate(0.8, -0.1))
+    due = DUserEquipment(300, (Numerology.N1,), Coordinate(0.3, 0.1))
+    eue = EUserEquipment(300, (LTEResourceBlock.E,), Coordinate(-0.2, 0.1))
+    for ue in (gue_near, gue_far, due, eue):
+        ue.register_nb(enb, gnb)
+        ue.numerology_in_use = ue.candidate_set[0]
+
+    # NOMA layers with different numerology, overlapped with the co-channel area of the eNB
+    for j in range(0, 8, 4):
+        gnb.frame.layer[0].allocate_resource_block(0, j, gue_near)
+        gnb.frame.layer[2].allocate_resource_block(2, j, due)
+    for j in range(0, 8, 2):
+        gnb.frame.layer[1].allocate_resource_block(0, j, gue_far)
+    for i in range(40, 44):
+        enb.frame.layer[0].allocate_resource_block(i, 0, eue)
+    enb.frame.layer[0].allocate_resource_block(3, 4, eue)
+    return gue_near, gue_far, due, eue
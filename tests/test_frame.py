@@ -0,0 +1,227 @@
+import random
+
+from src.resource_allocation.ds.eutran import EUserEquipment
+from src.resource_allocation.ds.space import empty_space, merge, scan
+from src.resource_allocation.ds.util_enum import LTEResourceBlock, Numerology
+from src.resource_allocation.ds.util_type import Coordinate
+
+
+def scan_one_by_one(layer):
+    """The runs of unused BUs, by stepping through every BU."""
+    spaces = []
+    for i in range(layer.FREQ):
+        j_start = None
+        for j in range(layer.TIME + 1):
+            if j < layer.TIME and not layer.bu[i][j].is_used:
+                j_start = j if j_start is None else j_start
+            elif j_start is not None:
+                spaces.append({'i_start': i, 'j_start': j_start, 'i_end': i, 'j_end': j - 1})
+                j_start = None
+    return spaces
+
+
+def merge_pop_first(spaces):
+    """Merge the runs by popping the first one and searching the rest for the continuous rows."""
+    merged_spaces = []
+    while spaces:
+        space = spaces.pop(0)
+        i = 0
+        while i < len(spaces):
+            another_space = spaces[i]
+            if (another_space['i_start'] == space['i_end'] + 1) and (another_space['j_start'] == space['j_start']) and (
+                    another_space['j_end'] == space['j_end']):
+                space['i_end'] = another_space['i_end']
+                spaces.remove(another_space)
+            elif another_space['i_start'] > space['i_end'] + 1:
+                break
+            else:
+                i += 1
+        merged_spaces.append(space)
+    return merged_spaces
+
+
+def test_layer_array(nbs, new_ue):
+    enb, gnb = nbs
+    layer = gnb.frame.layer[1]
+
+    rb_1 = layer.allocate_resource_block(2, 4, new_ue(Numerology.N1))
+    rb_2 = layer.allocate_resource_block(6, 0, new_ue(Numerology.N2))
+    assert rb_1.rb_id != rb_2.rb_id
+    for rb in (rb_1, rb_2):
+        assert (layer.rb_id[rb.i_start:rb.i_end + 1, rb.j_start:rb.j_end + 1] == rb.rb_id).all()
+        assert layer.bu[rb.i_start][rb.j_start].is_upper_left
+    assert layer.is_used.sum() == rb_1.numerology.count_bu + rb_2.numerology.count_bu
+    assert layer.bu_status == [[bu.is_used for bu in row] for row in layer.bu]
+    assert layer.bu_status[2][4] is True and layer.bu_status[0][0] is False
+    assert not layer.is_empty(0, 2, 0, 4) and layer.is_empty(0, 1, 0, 7)
+
+    layer.undo()
+    assert (layer.rb_id[6:10, 0:2] == -1).all() and not layer.bu[6][0].is_upper_left
+    layer.undo()
+    assert not layer.is_used.any() and not layer.bu[2][4].is_upper_left
+
+
+def test_bu_status_in_place(nbs, new_ue):
+    enb, gnb = nbs
+    layer = gnb.frame.layer[0]
+    bu_status = layer.bu_status
+    rb = layer.allocate_resource_block(4, 0, new_ue(Numerology.N2))
+    assert layer.bu_status is bu_status and layer.bu_status_cache_is_valid
+    assert bu_status == layer.is_used.tolist()
+    rb.remove_rb()
+    assert not any(map(any, bu_status))
+    rb.undo()
+    assert bu_status == layer.is_used.tolist() and bu_status[4][0]
+    layer.undo()
+    assert layer.bu_status is bu_status and not any(map(any, bu_status))
+
+    layer.bu_status_cache_is_valid = False  # rebuilt from the array
+    assert layer.bu_status == bu_status
+
+
+def test_scan(nbs, place_random_rb):
+    enb, gnb = nbs
+    random.seed(3)
+    layer = gnb.frame.layer[0]
+    for _ in range(30):
+        place_random_rb([layer])
+    assert scan(layer) == scan_one_by_one(layer)
+    assert merge(scan(layer)) == merge_pop_first(scan_one_by_one(layer))
+    for space in empty_space(layer):
+        space.assert_is_empty()
+
+
+def test_empty_space_index(nbs, new_ue):
+    enb, gnb = nbs
+    layer = gnb.frame.layer[0]
+    layer.allocate_resource_block(0, 2, new_ue(Numerology.N1))
+    spaces = empty_space(layer)
+    assert empty_space(layer) is spaces
+    assert empty_space(gnb.frame.layer[1]) is empty_space(gnb.frame.layer[1])
+
+    def geometry(space_list):
+        return [(s.starting_i, s.starting_j, s.ending_i, s.ending_j) for s in space_list]
+
+    rb = layer.allocate_resource_block(8, 0, new_ue(Numerology.N0))
+    assert layer.empty_runs[8] is None and layer.empty_runs[0] is not None and layer.empty_spaces is None
+    assert geometry(empty_space(layer)) == [(2, 0, 7, 7), (9, 0, 39, 7)]  # too narrow for a RB beside the N1 RB
+    rb.remove_rb()
+    assert geometry(empty_space(layer)) == geometry(spaces)
+    rb.undo()
+    layer.undo()
+    assert geometry(empty_space(layer)) == geometry(spaces)
+    assert scan(layer) == scan_one_by_one(layer)
+
+
+def test_used_sum(nbs, place_random_rb):
+    enb, gnb = nbs
+    random.seed(5)
+    layer = gnb.frame.layer[1]
+    assert layer.num_of_used == 0 and layer.is_empty(0, layer.FREQ - 1, 0, layer.TIME - 1)
+    rb_list = []
+    for step in range(40):
+        if rb_list and step % 4 == 3:
+            rb_list.pop(random.randrange(len(rb_list))).remove_rb()
+        elif (rb := place_random_rb([layer])) is not None:
+            rb_list.append(rb)
+            if step % 5 == 4:
+                assert layer.num_of_used == layer.is_used.sum()
+                layer.undo()
+                rb_list.pop()
+
+        assert layer.num_of_used == layer.is_used.sum()
+        assert (layer.used_sum[1:, 1:] == layer.is_used.cumsum(axis=0).cumsum(axis=1)).all()
+        for _ in range(10):
+            i_start, i_end = sorted(random.randrange(layer.FREQ) for _ in range(2))
+            j_start, j_end = sorted(random.randrange(layer.TIME) for _ in range(2))
+            count = layer.is_used[i_start:i_end + 1, j_start:j_end + 1].sum()
+            assert layer.count_used(i_start, i_end, j_start, j_end) == count
+            assert layer.is_empty(i_start, i_end, j_start, j_end) == (count == 0)
+
+
+def test_column(nbs, place_random_rb):
+    enb, gnb = nbs
+    random.seed(7)
+    assert gnb.frame.layer[0].bu[3][5]._column is gnb.frame.layer[2].bu[3][5]._column
+    assert gnb.frame.column[3][5].cochannel is enb.frame.column[43][5]
+    assert enb.frame.column[43][5].cochannel is gnb.frame.column[3][5]
+
+    eue = EUserEquipment(300, (LTEResourceBlock.E,), Coordinate(0.4, 0.1))
+    eue.register_nb(enb, gnb)
+    enb.frame.layer[0].allocate_resource_block(40, 0, eue)
+    for _ in range(20):
+        rb = place_random_rb(gnb.frame.layer)
+        if rb and random.random() < 0.3:
+            rb.remove_rb()
+    gnb.frame.layer[1].undo()
+
+    for frame in (gnb.frame, enb.frame):
+        for layer in frame.layer:
+            for bu in (bu for row in layer.bu for bu in row):
+                overlapped_rb = tuple(b.within_rb for b in bu.overlapped_bu if b.within_rb)
+                assert bu.overlapped_rb == overlapped_rb
+                assert set(bu.overlapped_ue) == set(rb.ue for rb in overlapped_rb)
+
+
+def test_row_mask(nbs, new_ue):
+    enb, gnb = nbs
+    layer = gnb.frame.layer[2]
+    assert layer.last_used() is None and layer.unused_runs(0) == [(0, 7)] and layer.first_unused(0, 3) == 3
+    layer.allocate_resource_block(0, 2, new_ue(Numerology.N2))
+    rb = layer.allocate_resource_block(1, 6, new_ue(Numerology.N2))
+    assert layer.row_mask[1] == 0b11001100
+    assert layer.unused_runs(1) == [(0, 1), (4, 5)] and layer.unused_runs(4) == [(0, 5)]
+    assert layer.first_unused(1, 2) == 4 and layer.first_unused(1, 6) == layer.TIME
+    assert layer.last_used() == (4, 7)
+    rb.remove_rb()
+    assert layer.row_mask[1] == 0b1100 and layer.last_used() == (3, 3)
+    rb.undo()
+    assert layer.last_used() == (4, 7)
+    layer.undo()
+    layer.undo()
+    assert not any(layer.row_mask)
+
+
+def test_rb_capacity(nbs, place_random_rb):
+    enb, gnb = nbs
+    random.seed(7)
+    assert gnb.frame.rb_capacity(Numerology.N0) == 40 * 8 // Numerology.N0.count_bu
+    assert enb.frame.rb_capacity(LTEResourceBlock.E) == 50 * 8 // 4
+    for step in range(60):
+        rb = place_random_rb(gnb.frame.layer)
+        if rb and step % 3 == 2:
+            rb.remove_rb()
+        for numerology in Numerology:
+            for layer in gnb.frame.layer:
+                capacity = layer.rb_capacity(numerology)
+                assert capacity == (layer.FREQ * layer.TIME - layer.is_used.sum()) // numerology.count_bu
+                assert all(space.num_of_rb(numerology) <= capacity for space in empty_space(layer))
+            assert gnb.frame.rb_capacity(numerology) == max(layer.rb_capacity(numerology) for layer in gnb.frame.layer)
+
+
+def test_reset(nbs, new_ue):
+    enb, gnb = nbs
+    overlapped_bu = [bu.overlapped_bu for layer in gnb.frame.layer for row in layer.bu for bu in row]
+    for layer in gnb.frame.layer:
+        layer.allocate_resource_block(2, 0, new_ue(Numerology.N1))
+    eue = EUserEquipment(300, (LTEResourceBlock.E,), Coordinate(0.4, 0.1))
+    eue.register_nb(enb, gnb)
+    enb.frame.layer[0].allocate_resource_block(45, 4, eue).remove_rb()
+    gnb.frame.layer[0].reset_available_frequent_offset()
+
+    enb.frame.reset()
+    gnb.frame.reset()
+    for frame in (enb.frame, gnb.frame):
+        assert not any(column.occupied for row in frame.column for column in row)
+        for layer in frame.layer:
+            assert layer.num_of_used == 0 and not layer.is_used.any()
+            assert not any(layer.row_mask) and not any(any(row) for row in layer.bu_status)
+            assert layer.new_rb_id() == 0 and not layer.undo()
+            assert len(empty_space(layer)) == 1
+            for bu in (bu for row in layer.bu for bu in row):
+                assert bu.within_rb is None and bu.sinr == float('-inf') and not bu.is_upper_left
+                assert bu.interference is None and not bu.undo()
+    assert [bu.overlapped_bu for layer in gnb.frame.layer for row in layer.bu for bu in row] == overlapped_bu
+    assert gnb.frame.layer[0].bu[0][0].is_cochannel
+    gnb.frame.layer[1].allocate_resource_block(2, 0, new_ue(Numerology.N1))
+    assert gnb.frame.layer[1].bu[2][0].overlapped_rb == ()
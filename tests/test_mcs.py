@@ -0,0 +1,25 @@
+import math
+
+import pytest
+
+from src.resource_allocation.ds.util_enum import E_MCS, G_MCS, _SINRtoMCS
+
+THRESHOLD = [getattr(_SINRtoMCS, f'CQI{i}') for i in range(1, 16)]
+
+
+@pytest.mark.parametrize('mcs', [E_MCS, G_MCS])
+def test_sinr_to_mcs(mcs):
+    worst, best = mcs.get_worst().index, mcs.get_best().index
+    for i, threshold in enumerate(THRESHOLD, start=1):
+        expected = mcs.CQI0 if i < worst else mcs[f'CQI{min(i, best)}']
+        assert mcs.sinr_to_mcs(threshold) is expected
+        expected = mcs.CQI0 if i - 1 < worst else mcs[f'CQI{min(i - 1, best)}']
+        assert mcs.sinr_to_mcs(math.nextafter(threshold, -math.inf)) is expected
+    assert mcs.sinr_to_mcs(float('-inf')) is mcs.CQI0
+    assert mcs.sinr_to_mcs(float('inf')) is mcs.get_best()
+
+
+@pytest.mark.parametrize('mcs', [E_MCS, G_MCS])
+def test_sinr_to_mcs_array(mcs):
+    sinr = [float('-inf')] + [t + d for t in THRESHOLD for d in (-0.001, 0.0, 0.001)] + [100.0]
+    assert mcs.sinr_to_mcs_array(sinr) == tuple(mcs.sinr_to_mcs(s) for s in sinr)
@@ -0,0 +1,16 @@
+import pytest
+
+from src.channel_model.path_loss import PATH_LOSS, UMa, UMi
+
+DISTANCE = [0.01 * k for k in range(1, 101)]
+
+
+@pytest.mark.parametrize('name, model', [('UMa', UMa), ('UMi', UMi)])
+def test_registry(name, model):
+    assert PATH_LOSS[name] is model
+
+
+def test_models():
+    assert UMa.path_loss(1.0) == 128.1
+    assert UMi.path_loss(1.0) == 140.7
+    assert all(UMi.path_loss(d) > UMa.path_loss(d) for d in DISTANCE)
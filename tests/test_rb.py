@@ -0,0 +1,68 @@
+import pickle
+
+from src.resource_allocation.ds.util_enum import G_MCS, Numerology
+
+
+def lowest_mcs_one_by_one(rb_list):
+    return min(rb_list, key=lambda rb: rb.mcs.value).mcs if rb_list else None
+
+
+def test_lowest_mcs(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    gue_near, gue_far, due, eue = ue_list
+    for ue in ue_list:
+        channel_model.sinr_ue(ue)
+    rb_list = gue_far.gnb_info.rb
+    assert rb_list.lowest_mcs() == lowest_mcs_one_by_one(rb_list)
+    assert due.enb_info.rb.lowest_mcs() is None
+
+    # the new RB is recounted after its SINR is calculated
+    gue_far.numerology_in_use = Numerology.N2
+    gnb.frame.layer[0].allocate_resource_block(4, 0, due)
+    rb = gnb.frame.layer[1].allocate_resource_block(4, 0, gue_far)  # NOMA with the RB of due
+    channel_model.sinr_rb(rb)
+    assert rb_list.lowest_mcs() == lowest_mcs_one_by_one(rb_list)
+
+    rb_list[0].remove_rb()
+    assert rb_list.lowest_mcs() == lowest_mcs_one_by_one(rb_list)
+    rb_list[-1].sinr = float('-inf')
+    assert rb_list.lowest_mcs() is G_MCS.CQI0
+    channel_model.undo()
+    assert rb_list.lowest_mcs() == lowest_mcs_one_by_one(rb_list)
+
+    rb_list.sort(key=lambda r: r.mcs.value)
+    rb_list.pop()
+    assert rb_list.lowest_mcs() == lowest_mcs_one_by_one(rb_list)
+    rb_list_copy = pickle.loads(pickle.dumps(rb_list))
+    assert rb_list_copy.lowest_mcs() == lowest_mcs_one_by_one(rb_list_copy)
+
+
+def test_highest_frequency_rb(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    due = ue_list[2]
+    rb_list = due.gnb_info.rb
+    rb_list.sort(key=lambda r: r.j_start, reverse=True)
+    assert due.gnb_info.highest_frequency_rb() is rb_list[-1]
+    assert [(r.i_start, r.j_start) for r in rb_list] == [(2, 0), (2, 4)]
+
+    rb = gnb.frame.layer[2].allocate_resource_block(6, 0, due)
+    assert rb_list._is_by_position and due.gnb_info.highest_frequency_rb() is rb
+    rb_front = gnb.frame.layer[0].allocate_resource_block(4, 4, due)
+    assert not rb_list._is_by_position
+    assert due.gnb_info.highest_frequency_rb() is rb
+    assert rb_list == sorted(rb_list, key=lambda r: (r.i_start, r.j_start))
+    rb.remove_rb()
+    assert due.gnb_info.highest_frequency_rb() is rb_front
+
+
+def test_throughput(nbs, channel_model, ue_list):
+    gue_far = ue_list[1]
+    channel_model.sinr_ue(gue_far)
+    rb_list = gue_far.gnb_info.rb
+    rb_list.sort(key=lambda r: r.mcs.value, reverse=True)
+    assert rb_list.throughput() == lowest_mcs_one_by_one(rb_list).value * len(rb_list)
+    while rb_list:
+        assert rb_list.throughput_without_last() == (
+            lowest_mcs_one_by_one(rb_list[:-1]).value * (len(rb_list) - 1) if len(rb_list) > 1 else 0.0)
+        rb_list[-1].remove_rb()
+    assert rb_list.throughput() == 0.0 and rb_list.throughput_without_last() == 0.0
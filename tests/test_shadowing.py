@@ -0,0 +1,30 @@
+import math
+import random
+
+from src.channel_model.shadowing import Shadowing
+
+
+def test_legacy_noise():
+    state = random.getstate()
+    noise = Shadowing(noise_variance=8).default
+    assert random.getstate() == state, 'The global random generator should not be touched.'
+
+    # the original ChannelModel.noise(8)
+    random.seed('foobar')
+    seed = 0 - random.randint(1, 100)
+    runiform = [0.0, 0.0]
+    slevel = 0.0
+    while slevel < 1.0:
+        runiform = [2.0 * Shadowing.bsd_rand(seed) - 1.0, 2.0 * Shadowing.bsd_rand(seed) - 1.0]
+        slevel = runiform[0] * runiform[0] + runiform[1] * runiform[1]
+    assert noise == (8 ** 0.5) * runiform[0] * math.sqrt(2 * math.log10(slevel) / slevel)
+    assert (Shadowing(noise_variance=8).table(2, 3) == noise).all()
+
+
+def test_per_link():
+    shadowing = Shadowing(noise_variance=8, seed=5)
+    assert shadowing.default == 0.0
+    table = shadowing.table(2, 3).copy()
+    assert table.shape == (2, 3) and len(set(table.flatten())) == 6
+    assert (shadowing.table(2, 5)[:, :3] == table).all(), 'The drawn links should be kept.'
+    assert (Shadowing(noise_variance=8, seed=5).table(2, 3) == table).all()
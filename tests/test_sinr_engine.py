@@ -0,0 +1,243 @@
+import gc
+import math
+import weakref
+
+from src.channel_model.sinr import ChannelModel
+from src.resource_allocation.algo.utils import may_be_fulfilled
+from src.resource_allocation.ds.frame import BaseUnit
+from src.resource_allocation.ds.ngran import GNodeB, GUserEquipment
+from src.resource_allocation.ds.space import Space
+from src.resource_allocation.ds.util_enum import G_MCS, NodeBType, Numerology
+from src.resource_allocation.ds.util_type import CircularRegion, Coordinate
+
+
+def sinr_bu_one_by_one(channel_model: ChannelModel, bu: BaseUnit) -> float:
+    """The formula of the SINR of a single BU."""
+
+    def power_rx(nodeb, ue) -> float:
+        return channel_model.power_rx(
+            nodeb.nb_type, nodeb.power_tx,
+            ue.coordinate.distance_gnb if nodeb.nb_type == NodeBType.G else ue.coordinate.distance_enb)
+
+    rb = bu.within_rb
+    nodeb = bu.layer.nodeb
+    signal: float = power_rx(nodeb, rb.ue)
+    interference_noma: float = 0.0
+    interference_ini: float = 0.0
+    interference_cross: float = 0.0
+    for overlapped_rb in bu.overlapped_rb:
+        overlapped_nodeb = overlapped_rb.layer.nodeb
+        interference: float = power_rx(overlapped_nodeb, rb.ue)
+        if overlapped_nodeb.nb_type == NodeBType.G and nodeb.nb_type == NodeBType.G:
+            if signal < power_rx(overlapped_nodeb, overlapped_rb.ue):
+                interference_noma += interference
+        if overlapped_nodeb.nb_type != nodeb.nb_type:
+            interference_cross += interference
+        if overlapped_rb.numerology.freq != rb.numerology.freq:
+            interference_ini += interference
+
+    if nodeb.nb_type == NodeBType.E:
+        channel: int = bu.absolute_i
+    else:
+        channel: int = bu.absolute_i + channel_model.cochannel_index['e_freq'] - channel_model.cochannel_index[
+            'co_bandwidth']
+    interference_channel: float = 0.0
+    for bs in channel_model.channel_bs[channel]:
+        interference_channel += channel_model.power_rx(
+            NodeBType.E, 46, Coordinate.calc_distance(bs, rb.ue.coordinate))
+
+    sinr: float = signal / (
+            interference_noma + interference_ini + interference_cross
+            + interference_channel
+            + channel_model.awgn_noise)
+    return 10 * math.log10(sinr)
+
+
+def test_sinr_ue(channel_model, ue_list):
+    for ue in ue_list:
+        channel_model.sinr_ue(ue)
+    for ue in ue_list:
+        for nb_info in ('gnb_info', 'enb_info'):
+            for rb in getattr(ue, nb_info).rb if hasattr(ue, nb_info) else []:
+                bu_sinr = []
+                for i in range(rb.i_start, rb.i_end + 1):
+                    for j in range(rb.j_start, rb.j_end + 1):
+                        bu: BaseUnit = rb.layer.bu[i][j]
+                        assert not bu.is_to_recalculate_sinr
+                        assert bu.sinr == sinr_bu_one_by_one(channel_model, bu)
+                        bu_sinr.append(bu.sinr)
+                assert rb.sinr == min(bu_sinr)
+                assert rb.mcs is rb.layer.nodeb.nb_type.to_mcs.sinr_to_mcs(rb.sinr)
+
+
+def test_power_rx_table(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    channel_model.build_power_rx_table((enb, gnb), ue_list[:2])
+    assert channel_model.link_index(gnb, ue_list[1]) == (1, 1)
+    for ue in ue_list:  # the last two UEs are added lazily
+        assert channel_model.link_power_rx(gnb, ue) == channel_model.power_rx(
+            NodeBType.G, gnb.power_tx, ue.coordinate.distance_gnb)
+        assert channel_model.link_power_rx(enb, ue) == channel_model.power_rx(
+            NodeBType.E, enb.power_tx, ue.coordinate.distance_enb)
+    assert channel_model.link_index(enb, ue_list[3]) == (0, 3)
+
+
+def test_memo_signature(nbs, channel_model, ue_list, new_ue):
+    enb, gnb = nbs
+    rb = ue_list[1].gnb_info.rb[0]
+    channel_model.sinr_rb(rb)
+    memo = channel_model.engine._memo[rb]
+    assert len(memo) < (rb.i_end - rb.i_start + 1) * (rb.j_end - rb.j_start + 1)
+    sinr_before = [bu.sinr for row in gnb.frame.layer[1].bu for bu in row]
+
+    # a new overlapped RB changes the signature of the BUs
+    gue_new = new_ue()
+    assert gnb.frame.layer[2].allocate_resource_block(0, 0, gue_new) is not None
+    channel_model.sinr_rb(rb)
+    assert [bu.sinr for row in gnb.frame.layer[1].bu for bu in row] != sinr_before
+    for i in range(rb.i_start, rb.i_end + 1):
+        for j in range(rb.j_start, rb.j_end + 1):
+            bu = gnb.frame.layer[1].bu[i][j]
+            assert bu.sinr == sinr_bu_one_by_one(channel_model, bu)
+
+    channel_model.undo()
+    gnb.frame.layer[2].undo()
+    channel_model.sinr_rb(rb)
+    assert [bu.sinr for row in gnb.frame.layer[1].bu for bu in row] == sinr_before
+
+
+def test_memo_drops_undone_rb(nbs, channel_model, ue_list, new_ue):
+    enb, gnb = nbs
+    rb = ue_list[1].gnb_info.rb[0]
+    gue_new = new_ue()
+    layer = gnb.frame.layer[2]
+    undone_rb = []
+    num_of_signature = []
+    for _ in range(10):
+        undone_rb.append(weakref.ref(layer.allocate_resource_block(0, 0, gue_new)))
+        channel_model.sinr_rb(rb)
+        channel_model.undo()
+        layer.undo()
+        num_of_signature.append(len(channel_model.engine._memo[rb]))
+    gc.collect()
+    assert all(r() is None for r in undone_rb)
+    # a new RB of the same UE has the same signature
+    assert len(set(num_of_signature)) == 1
+
+
+def test_running_interference(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    gue_near, gue_far, due = ue_list[:3]
+    rb = gnb.frame.layer[1].allocate_resource_block(12, 0, gue_far)  # out of the co-channel area
+    bu = gnb.frame.layer[1].bu[12][0]
+    channel_model.sinr_rb(rb)
+    assert bu.interference == (0.0, 0.0, 0.0) and bu.interference_delta == ()
+
+    # a RB placed as the last overlapped RB is added to the running interference
+    last_rb = gnb.frame.layer[2].allocate_resource_block(12, 0, due)
+    assert bu.interference_delta == (last_rb,)
+    assert channel_model.engine._sinr_bu([bu]) == [sinr_bu_one_by_one(channel_model, bu)]  # skip the memo
+    interference = bu.interference
+    assert interference != (0.0, 0.0, 0.0) and bu.interference_delta == ()
+
+    # otherwise the interference is summed from scratch
+    first_rb = gnb.frame.layer[0].allocate_resource_block(12, 0, gue_near)
+    assert bu.overlapped_rb == (first_rb, last_rb) and bu.interference is None
+    assert channel_model.engine._sinr_bu([bu]) == [sinr_bu_one_by_one(channel_model, bu)]
+    first_rb.remove_rb()
+    assert bu.interference is None
+    assert channel_model.engine._sinr_bu([bu]) == [sinr_bu_one_by_one(channel_model, bu)]
+    assert bu.interference == interference
+
+    # undo drops the running interference, even if it's summed after the undo function is recorded
+    first_rb.undo()
+    assert bu.interference is None
+    channel_model.engine._sinr_bu([bu])
+    gnb.frame.layer[0].undo()
+    assert bu.interference is None
+    assert channel_model.engine._sinr_bu([bu]) == [sinr_bu_one_by_one(channel_model, bu)]
+    assert bu.interference == interference
+
+
+def test_running_interference_summed_after_placed(nbs, channel_model, ue_list, new_ue):
+    enb, gnb = nbs
+    rb = ue_list[1].gnb_info.rb[1]  # (0, 2) to (3, 3)
+    bu = gnb.frame.layer[1].bu[0][2]
+    sinr = sinr_bu_one_by_one(channel_model, bu)
+    assert bu.interference is None
+
+    # the running interference is summed with the overlapped RB, undoing the RB has to drop it
+    gue_new = new_ue()
+    gnb.frame.layer[2].allocate_resource_block(0, 0, gue_new)
+    channel_model.engine._sinr_bu([bu])
+    assert bu.interference is not None
+    gnb.frame.layer[2].undo()
+    assert bu.interference is None
+    assert channel_model.engine._sinr_bu([bu]) == [sinr]
+
+
+def test_channel_interference_table(channel_model, new_ue):
+    # more than the initial capacity of the table
+    ue_list = [new_ue(coordinate=Coordinate(0.3 + k / 100, 0.1)) for k in range(20)]
+    channel_list = [k % len(channel_model.channel_bs) for k in range(len(ue_list))]
+    interference = channel_model.channel_interference_array(channel_list, ue_list)
+    for channel, ue, i in zip(channel_list, ue_list, interference.tolist()):
+        expected = 0.0
+        for bs in channel_model.channel_bs[channel]:
+            expected += channel_model.power_rx(NodeBType.E, 46, Coordinate.calc_distance(bs, ue.coordinate))
+        assert i == expected
+    assert (channel_model.channel_interference_array(channel_list[::-1], ue_list[::-1]) == interference[::-1]).all()
+
+
+def test_path_loss_per_nb_type(nbs, cochannel_index, ue_list):
+    enb, gnb = nbs
+    channel_model = ChannelModel(cochannel_index, path_loss={NodeBType.G: 'UMi'})
+    ue = ue_list[0]
+    assert channel_model.link_power_rx(gnb, ue) < channel_model.power_rx(NodeBType.E, gnb.power_tx,
+                                                                         ue.coordinate.distance_gnb)
+    assert channel_model.link_power_rx(gnb, ue) == channel_model.power_rx(NodeBType.G, gnb.power_tx,
+                                                                          ue.coordinate.distance_gnb)
+
+
+def test_sinr_ue_batch(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    rb_list = [rb for ue in ue_list for nb_info in ('gnb_info', 'enb_info') if hasattr(ue, nb_info)
+               for rb in getattr(ue, nb_info).rb]
+    channel_model.sinr_ue_batch(ue_list + ue_list[:1])
+    for rb in rb_list:
+        for i in range(rb.i_start, rb.i_end + 1):
+            for j in range(rb.j_start, rb.j_end + 1):
+                assert rb.layer.bu[i][j].sinr == sinr_bu_one_by_one(channel_model, rb.layer.bu[i][j])
+    sinr = [rb.sinr for rb in rb_list]
+
+    # nothing to recalculate, but still an undo frame
+    channel_model.sinr_ue_batch(ue_list)
+    assert [rb.sinr for rb in rb_list] == sinr
+    assert channel_model.undo()
+    assert [rb.sinr for rb in rb_list] == sinr
+
+    assert channel_model.undo()
+    assert all(rb.sinr == float('-inf') for rb in rb_list)
+    assert not channel_model.undo()
+
+
+def test_mcs_ceiling(nbs, channel_model, ue_list):
+    enb, gnb = nbs
+    channel_model.sinr_ue_batch(ue_list)
+    for ue in ue_list:
+        for nb_info in ('gnb_info', 'enb_info'):
+            for rb in getattr(ue, nb_info).rb if hasattr(ue, nb_info) else []:
+                assert rb.mcs.index <= channel_model.mcs_ceiling(rb.layer.nodeb, ue).index
+
+    space = Space(gnb.frame.layer[0], 4, 0, 7, 7)
+    assert may_be_fulfilled(ue_list[0], (space,), channel_model)
+    assert not may_be_fulfilled(ue_list[0], (space,), channel_model,
+                                request_data_rate=channel_model.mcs_ceiling(gnb, ue_list[0]).value * 8 + 1)
+
+    # out of range
+    wide_gnb = GNodeB(CircularRegion(0.5, 0.0, 30.0), frame_freq=40, frame_time=8, frame_max_layer=1)
+    far_ue = GUserEquipment(300, (Numerology.N1,), Coordinate(25.0, 0.0))
+    far_ue.register_nb(enb, wide_gnb)
+    far_ue.numerology_in_use = Numerology.N1
+    assert channel_model.mcs_ceiling(wide_gnb, far_ue) is G_MCS.CQI0
+    assert not may_be_fulfilled(far_ue, (Space(wide_gnb.frame.layer[0], 0, 0, 39, 7),), channel_model)
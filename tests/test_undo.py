@@ -99,3 +99,27 @@ def test_decorator():
     assert test.l == []
 
 
+class Nested(Undo):
+    def __init__(self):
+        super().__init__()
+        self.i = 0
+        self.t2 = Test2()
+
+    @Undo.undo_func_decorator
+    def increase_both(self):
+        self.append_undo_attr(self, 'i', self.i)
+        self.i += 1
+        self.t2.increase()
+        self.append_undo_nested(self.t2)
+
+
+def test_typed_records():
+    test = Nested()
+    test.increase_both()
+    test.increase_both()
+    assert test.i == 2 and test.t2.i == 6
+    test.undo()
+    assert test.i == 1 and test.t2.i == 3
+    test.purge_undo()
+    assert test.i == 1 and test.t2.i == 3 and not test.t2.undo()
+    assert not test.undo()